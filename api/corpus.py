@@ -0,0 +1,130 @@
+"""corpus.py
+
+Registry for working with several VerbNet versions in one process. Versions
+are resolved against config.txt once, loaded once, and the read-only records of
+all loaded versions share their strings and every member, role, predicate and
+frame that is identical between versions.
+
+"""
+
+import os
+import sys
+from verbnet import AbstractRecord, CONFIG_PATH, FrameRecord, VerbClassRecord, VerbNetParser, read_config
+
+
+class Interner(object):
+    """Hash-consing table for VerbNet records. Records that have the same
+    content (including the IDs of the classes they belong to) are replaced by a
+    single shared instance, and the strings of the shared records are interned.
+
+    Class records are not shared themselves since they carry their version, but
+    everything below them is."""
+
+    def __init__(self):
+        self.records = {}
+
+    def value(self, value):
+        """Copy of a plain value (strings, lists, tuples and dicts of them) with
+        every string interned, and lists turned into tuples like records store
+        them. Records are left as they are"""
+        if isinstance(value, str):
+            return sys.intern(value)
+        if isinstance(value, (list, tuple)):
+            return tuple([self.value(v) for v in value])
+        if isinstance(value, dict):
+            return dict([(self.value(k), self.value(v)) for k, v in value.items()])
+        return value
+
+    def key(self, value):
+        """Hashable version of a value. Records in it are already shared, so
+        their identity stands for their content"""
+        if isinstance(value, AbstractRecord):
+            return id(value)
+        if isinstance(value, (list, tuple)):
+            return tuple([self.key(v) for v in value])
+        if isinstance(value, dict):
+            return tuple(sorted([(k, self.key(v)) for k, v in value.items()]))
+        return value
+
+    def record(self, record):
+        """Return the shared record equal to record, sharing its parts first"""
+        if isinstance(record, VerbClassRecord):
+            record._set(members=[self.record(m) for m in record.members],
+                        frames=[self.record(f) for f in record.frames],
+                        themroles=[self.record(t) for t in record.themroles],
+                        subclasses=[self.record(sub) for sub in record.subclasses])
+            record._set(**dict([(f, self.value(getattr(record, f))) for f in record._fields()]))
+            return record
+        if isinstance(record, FrameRecord):
+            record._set(syntax=[self.record(r) for r in record.syntax],
+                        predicates=[self.record(p) for p in record.predicates])
+
+        key = (type(record), tuple([self.key(getattr(record, f)) for f in record._fields()]))
+        shared = self.records.get(key)
+        if shared is None:
+            record._set(**dict([(f, self.value(getattr(record, f))) for f in record._fields()]))
+            self.records[key] = shared = record
+        return shared
+
+
+class CorpusRegistry(object):
+    """Knows where each VerbNet version lives, and keeps the versions that have
+    been loaded. The VERBNET_PATH_<version> lines of config.txt are read the
+    first time they are needed, and more versions (like vn-gl) can be added
+    with register().
+
+    Versions are loaded as read-only records (backend="lxml" unless something
+    else is asked for), which all go through the same Interner, so that loading
+    another version mostly costs what is different about it."""
+
+    def __init__(self, config_path=CONFIG_PATH, share=True):
+        self.config_path = config_path
+        self.interner = Interner() if share else None
+        self.corpora = {}
+        self._directories = None
+
+    @property
+    def directories(self):
+        if self._directories is None:
+            self._directories = {}
+            if os.path.exists(self.config_path):
+                for name, value in read_config(self.config_path).items():
+                    if name.startswith("VERBNET_PATH"):
+                        self._directories[name[len("VERBNET_PATH"):].strip("_ ")] = value
+        return self._directories
+
+    def register(self, version, directory):
+        """Add (or move) a version, dropping it first if it was loaded"""
+        self.unload(version)
+        self.directories[version] = directory
+
+    def versions(self):
+        return sorted(self.directories)
+
+    def directory(self, version):
+        if version not in self.directories:
+            raise Exception("VerbNet version %s is not registered, and there is no VERBNET_PATH for it in %s"
+                            % (version, self.config_path))
+        return self.directories[version]
+
+    def get(self, version="3.4", **kwargs):
+        """Return the VerbNetParser for a version, loading it the first time.
+        kwargs are passed to VerbNetParser on that first load"""
+        if version not in self.corpora:
+            kwargs.setdefault("backend", "lxml")
+            kwargs.setdefault("interner", self.interner)
+            self.corpora[version] = VerbNetParser(directory=self.directory(version), version=version, **kwargs)
+        return self.corpora[version]
+
+    def unload(self, version):
+        """Forget a loaded version. Shared records it used stay in the interner,
+        for the other versions and for the next load"""
+        self.corpora.pop(version, None)
+
+
+registry = CorpusRegistry()
+
+
+def get_corpus(version="3.4", **kwargs):
+    """Return a version from the default registry, loading it the first time"""
+    return registry.get(version, **kwargs)
@@ -0,0 +1,1345 @@
+"""indexes.py
+
+The indexes a VerbNetParser keeps over its classes: posting lists from the
+predicates, ARGs, syntax and examples of the frames to the frames, the member
+indexes by sense, roleset, feature and FrameNet frame, the thematic roles, the
+class hierarchy and the compiled selectional restrictions, with the helpers
+they share. Nothing in here imports verbnet, the indexes only rely on the
+attributes of the classes, members and frames they are given.
+
+"""
+
+import bisect
+import math
+import re
+
+try:
+    import numpy
+except ImportError:
+    # ThemroleIndex works on plain lists of masks without it, only slower
+    numpy = None
+
+__all__ = ["FrameIndex", "PredicateIndex", "ArgumentIndex", "FramePatternIndex", "ExampleIndex",
+           "SenseIndex", "RolesetIndex", "FeatureIndex", "FrameNetIndex", "ThemroleIndex", "HierarchyIndex",
+           "RestrictionIndex", "CompiledRestrictions", "compile_restrictions", "restriction_features",
+           "restrictions_allow", "natural_key", "sort_classes", "inherited_themroles", "parse_sense_key",
+           "parse_sense_keys", "unique_classes", "sequence_tokens", "find_segment", "example_words",
+           "parse_example_query", "find_phrase", "trigrams"]
+
+
+class FrameIndex(object):
+    """Posting lists from keys taken from frames (see frame_keys) to the frames
+    that have them, and the classes of those frames. Results come back without
+    duplicates, in the order the frames were indexed, which is the order of the
+    files and of the frames in them.
+
+    Indexed Frames keep a reference to the index in their indexes dict, under
+    the name of the index, so that add_predicates and remove_predicates update
+    it."""
+
+    name = None
+
+    def __init__(self):
+        # id(frame) -> (seq, class, frame, keys), and key -> {id(frame): entry}
+        self._frames = {}
+        self._postings = {}
+        # Sorted lists of (class, frame) and of classes, per key
+        self._frame_lists = {}
+        self._class_lists = {}
+        self._count = 0
+
+    def frame_keys(self, frame):
+        raise NotImplementedError
+
+    def add_class(self, vc):
+        """Index the frames of a top level class and of all its subclasses"""
+        for c in [vc] + vc.get_all_subclasses():
+            for frame in c.frames:
+                self.add_frame(c, frame)
+
+    def remove_class(self, vc):
+        for c in [vc] + vc.get_all_subclasses():
+            for frame in c.frames:
+                self.remove_frame(frame)
+
+    def add_frame(self, vc, frame, seq=None):
+        if seq is None:
+            seq = self._count
+            self._count += 1
+        entry = (seq, vc, frame, self.frame_keys(frame))
+        self._frames[id(frame)] = entry
+        for key in entry[3]:
+            self._postings.setdefault(key, {})[id(frame)] = entry
+            self._changed(key)
+        # Records are read-only and have no indexes to keep up to date
+        if hasattr(frame, "indexes"):
+            frame.indexes[self.name] = self
+
+    def remove_frame(self, frame):
+        entry = self._frames.pop(id(frame), None)
+        if entry is None:
+            return None
+        for key in entry[3]:
+            postings = self._postings[key]
+            del postings[id(frame)]
+            if not postings:
+                del self._postings[key]
+            self._changed(key)
+        return entry
+
+    def update_frame(self, frame):
+        """Reindex a frame after its predicates changed, keeping its place"""
+        entry = self.remove_frame(frame)
+        if entry is not None:
+            self.add_frame(entry[1], frame, entry[0])
+
+    def _changed(self, key):
+        self._frame_lists.pop(key, None)
+        self._class_lists.pop(key, None)
+
+    def frames(self, key):
+        """Return [(class, frame), ...] for the frames with a key"""
+        if key not in self._frame_lists:
+            entries = sorted(self._postings.get(key, {}).values(), key=lambda entry: entry[0])
+            self._frame_lists[key] = [(vc, frame) for _, vc, frame, _ in entries]
+        return self._frame_lists[key]
+
+    def classes(self, key):
+        """Return the classes that have a frame with a key"""
+        if key not in self._class_lists:
+            self._class_lists[key] = unique_classes(self.frames(key))
+        return self._class_lists[key]
+
+    def count(self, key):
+        """The number of frames with a key, without building their list"""
+        return len(self._postings.get(key, ()))
+
+    def frame_has(self, frame, key):
+        entry = self._frames.get(id(frame))
+        return entry is not None and key in entry[3]
+
+    def keys(self):
+        return sorted(self._postings)
+
+
+class SenseIndex(object):
+    """Index of the members by their WordNet senses (see parse_sense_key). Each
+    sense maps to the [(class, subclass, member), ...] that have it, in load
+    order, and senses can be looked up exactly, by lemma, or by a range of
+    (ss_type, lex_filenum, lex_id), like all senses of lexicographer file 40"""
+
+    def __init__(self):
+        self._postings = {}
+        self._lemmas = {}
+        # The senses sorted by (ss_type, lex_filenum, lex_id, lemma) for range
+        # queries, rebuilt when needed after senses were added or removed
+        self._sorted = None
+
+    def add_member(self, entry):
+        for sense in entry[2].senses:
+            postings = self._postings.setdefault(sense, [])
+            if not postings:
+                self._lemmas.setdefault(sense[0], []).append(sense)
+                self._sorted = None
+            postings.append(entry)
+
+    def remove_member(self, entry):
+        for sense in entry[2].senses:
+            postings = [e for e in self._postings.get(sense, []) if e is not entry]
+            if postings:
+                self._postings[sense] = postings
+                continue
+            self._postings.pop(sense, None)
+            lemma_senses = [other for other in self._lemmas.get(sense[0], []) if other != sense]
+            if lemma_senses:
+                self._lemmas[sense[0]] = lemma_senses
+            else:
+                self._lemmas.pop(sense[0], None)
+            self._sorted = None
+
+    def lookup(self, sense_key):
+        """Return the entries for a sense key, given as a string like
+        "deal%2:40:01" or as a parsed sense"""
+        if isinstance(sense_key, str):
+            sense_key = parse_sense_key(sense_key)
+        return self._postings.get(sense_key, [])
+
+    def lookup_many(self, sense_keys):
+        return dict((key, list(self.lookup(key))) for key in sense_keys)
+
+    def senses(self, lemma):
+        """Return the senses of a lemma, in the order they were first seen"""
+        return list(self._lemmas.get(lemma, []))
+
+    def lemma(self, lemma):
+        """Return the entries for all the senses of a lemma, each entry once"""
+        return self._unique([self._postings[sense] for sense in self._lemmas.get(lemma, [])])
+
+    def range(self, start, stop=None):
+        """Return the entries for the senses whose (ss_type, lex_filenum, lex_id)
+        starts with start, or, with stop, is from start up to but not including
+        stop, e.g. range((2, 40)) for all the verb senses in file 40"""
+        if self._sorted is None:
+            self._sorted = sorted([(sense[1:], sense[0]) for sense in self._postings])
+        low = bisect.bisect_left(self._sorted, (tuple(start),))
+        if stop is None:
+            stop = tuple(start[:-1]) + (start[-1] + 1,)
+        high = bisect.bisect_left(self._sorted, (tuple(stop),), low)
+        return self._unique([self._postings[(lemma,) + numbers] for numbers, lemma in self._sorted[low:high]])
+
+    def lex_file(self, lex_filenum, ss_type=2):
+        return self.range((ss_type, lex_filenum))
+
+    def _unique(self, postings):
+        entries = []
+        seen = set()
+        for entry in [e for p in postings for e in p]:
+            if id(entry[2]) not in seen:
+                seen.add(id(entry[2]))
+                entries.append(entry)
+        return entries
+
+
+class RolesetIndex(object):
+    """Index of the members by their PropBank rolesets (the grouping of a
+    member, like "give.01"), which maps each roleset to the
+    [(class, subclass, member), ...] that have it, in load order"""
+
+    def __init__(self):
+        self._postings = {}
+        # Role types of each (sub)class, with those of the classes above it
+        self._roles = {}
+
+    def add_member(self, entry):
+        for roleset in entry[2].grouping:
+            self._postings.setdefault(roleset, []).append(entry)
+
+    def remove_member(self, entry):
+        for roleset in entry[2].grouping:
+            postings = [e for e in self._postings.get(roleset, []) if e is not entry]
+            if postings:
+                self._postings[roleset] = postings
+            else:
+                self._postings.pop(roleset, None)
+        self._roles.pop(id(entry[1]), None)
+
+    def lookup(self, roleset):
+        return self._postings.get(roleset, [])
+
+    def classes(self, roleset):
+        """Return the (sub)classes with a member that has the roleset"""
+        classes = []
+        for _, c, _ in self.lookup(roleset):
+            if not [other for other in classes if other is c]:
+                classes.append(c)
+        return classes
+
+    def roles(self, vc, subclass):
+        """Return the thematic role types of subclass, a class somewhere under
+        (or equal to) the top level class vc, including the roles it inherits"""
+        if id(subclass) not in self._roles:
+            self._roles[id(subclass)] = [role.role_type for role in inherited_themroles(vc, subclass)]
+        return self._roles[id(subclass)]
+
+    def map_rolesets(self, rolesets):
+        """Map a sequence of rolesets, like the predicates of SRL output, to
+        [(subclass, role types), ...] for each of them, in the same order. Every
+        distinct roleset is only looked up once, and repeated ones get the same
+        list"""
+        mapped = {}
+        for roleset in rolesets:
+            if roleset not in mapped:
+                mapped[roleset] = []
+                for vc, subclass, _ in self.lookup(roleset):
+                    if not [c for c, _ in mapped[roleset] if c is subclass]:
+                        mapped[roleset].append((subclass, self.roles(vc, subclass)))
+        return [mapped[roleset] for roleset in rolesets]
+
+
+class FeatureIndex(object):
+    """Index of the members by their features (like "+manner_of_motion"). Each
+    feature maps to the [(class, subclass, member), ...] that have it, and so
+    does each complete feature set (as a frozenset), in load order"""
+
+    def __init__(self):
+        self._postings = {}
+        self._sets = {}
+
+    def add_member(self, entry):
+        for feature in set(entry[2].features):
+            self._postings.setdefault(feature, []).append(entry)
+        self._sets.setdefault(frozenset(entry[2].features), []).append(entry)
+
+    def remove_member(self, entry):
+        for key, index in [(f, self._postings) for f in set(entry[2].features)] + \
+                          [(frozenset(entry[2].features), self._sets)]:
+            postings = [e for e in index.get(key, []) if e is not entry]
+            if postings:
+                index[key] = postings
+            else:
+                index.pop(key, None)
+
+    def features(self):
+        return sorted(self._postings)
+
+    def feature_sets(self):
+        """Return {frozenset of features: number of members}"""
+        return dict((key, len(postings)) for key, postings in self._sets.items())
+
+    def lookup(self, feature):
+        return self._postings.get(feature, [])
+
+    def any_of(self, features):
+        """Return the entries of the members with at least one of features,
+        those of the first feature first"""
+        if isinstance(features, str):
+            features = [features]
+        entries, seen = [], set()
+        for feature in features:
+            for e in self.lookup(feature):
+                if id(e) not in seen:
+                    seen.add(id(e))
+                    entries.append(e)
+        return entries
+
+    def all_of(self, features):
+        """Return the entries of the members that have all of features, going
+        through the shortest posting list and checking the others"""
+        if isinstance(features, str):
+            features = [features]
+        postings = sorted([self.lookup(feature) for feature in set(features)], key=len)
+        if not postings:
+            return []
+        entries = postings[0]
+        for other in postings[1:]:
+            ids = set([id(e) for e in other])
+            entries = [e for e in entries if id(e) in ids]
+        return list(entries)
+
+    def exactly(self, features):
+        """Return the entries of the members whose feature set is features"""
+        return list(self._sets.get(frozenset(features), []))
+
+
+class FrameNetIndex(object):
+    """Index between the FrameNet frames in the fn_mapping of the members and
+    the members and classes that map to them, both ways. Each frame maps to the
+    [(class, subclass, member), ...] that have it, in load order, and each
+    member name and (sub)class ID to its frames. Members without a mapping
+    (fn_mapping="None") are left out"""
+
+    def __init__(self):
+        self._members = {}
+        self._names = {}
+        self._classes = {}
+
+    @staticmethod
+    def mappings(member):
+        return [frame for frame in member.fn_mapping if frame != "None"]
+
+    def add_member(self, entry):
+        for frame in self.mappings(entry[2]):
+            self._members.setdefault(frame, []).append(entry)
+            self._add(self._names, entry[2].name, frame)
+            self._add(self._classes, entry[1].ID, frame)
+
+    def remove_member(self, entry):
+        for frame in self.mappings(entry[2]):
+            postings = [e for e in self._members.get(frame, []) if e is not entry]
+            if postings:
+                self._members[frame] = postings
+            else:
+                self._members.pop(frame, None)
+            self._remove(self._names, entry[2].name, frame)
+            self._remove(self._classes, entry[1].ID, frame)
+
+    # The frames of a name or class are kept with the number of members that
+    # map them there, so that they can be removed one member at a time
+    def _add(self, index, key, frame):
+        counts = index.setdefault(key, {})
+        counts[frame] = counts.get(frame, 0) + 1
+
+    def _remove(self, index, key, frame):
+        counts = index.get(key, {})
+        if counts.get(frame, 0) > 1:
+            counts[frame] -= 1
+            return
+        counts.pop(frame, None)
+        if not counts:
+            index.pop(key, None)
+
+    def frames(self):
+        return sorted(self._members)
+
+    def lookup(self, frame):
+        return self._members.get(frame, [])
+
+    def classes(self, frame):
+        """Return the (sub)classes with a member that maps to frame"""
+        classes = []
+        for _, c, _ in self.lookup(frame):
+            if not [other for other in classes if other is c]:
+                classes.append(c)
+        return classes
+
+    def members_of(self, frames):
+        """Return {frame: [(class, subclass, member), ...]} for a list of
+        frames"""
+        if isinstance(frames, str):
+            frames = [frames]
+        return dict((frame, list(self.lookup(frame))) for frame in frames)
+
+    def frames_of(self, names):
+        """Return {member name: [frames]} for a list of member names"""
+        if isinstance(names, str):
+            names = [names]
+        return dict((name, list(self._names.get(name, {}))) for name in names)
+
+    def frames_of_classes(self, class_IDs):
+        """Return {class ID: [frames]} for a list of (sub)class IDs, with the
+        frames of the members listed by that (sub)class itself"""
+        if isinstance(class_IDs, str):
+            class_IDs = [class_IDs]
+        return dict((ID, list(self._classes.get(ID, {}))) for ID in class_IDs)
+
+    def pairs(self):
+        """Return every (frame, class ID, member name) mapping, sorted, like the
+        FrameNet - VerbNet cross-reference lists them"""
+        return sorted(set([(frame, c.ID, m.name) for frame, entries in self._members.items()
+                           for _, c, m in entries]))
+
+
+class ThemroleIndex(object):
+    """Bitmasks of the thematic roles of every class and subclass of a
+    VerbNetParser, with the roles that subclasses inherit. Every role type
+    (compared without case) gets its own bit, and the masks are kept in a numpy
+    array (if numpy is there), so that role queries over all classes are a few
+    vectorized bitwise operations.
+
+    The masks are built on the first query after the classes changed. Bits are
+    never reassigned, so a mask stays valid across rebuilds."""
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.bits = {}
+        self.classes = None
+        self.masks = None
+        self._roles = None
+        # Role type -> the number of classes with it in their mask
+        self._counts = None
+
+    def invalidate(self):
+        self.classes = None
+
+    def _build(self):
+        if self.parser.lazy:
+            self.parser._load_all()
+        classes = []
+        masks = []
+        # Each ThematicRole by its type, like get_themroles() gives them
+        self._roles = {}
+        self._counts = {}
+        for vc in list(self.parser._file_top_classes.values()):
+            for c in [vc] + vc.get_all_subclasses():
+                classes.append(c)
+                role_types = set([role.role_type.lower() for role in inherited_themroles(vc, c)])
+                masks.append(self.mask(role_types, add=True))
+                for role_type in role_types:
+                    self._counts[role_type] = self._counts.get(role_type, 0) + 1
+        for vc in self.parser.get_verb_classes():
+            for role in vc.themroles:
+                self._roles.setdefault(role.role_type.lower(), []).append(role)
+        if numpy is not None:
+            # Beyond 64 role types the masks no longer fit in an integer type,
+            # an array of python ints still supports the same operations
+            masks = numpy.array(masks, dtype=numpy.uint64 if len(self.bits) <= 64 else object)
+        self.masks = masks
+        self.classes = classes
+
+    def mask(self, role_types, add=False):
+        """Return the mask of a list of role types, or None if one of them is
+        unknown and add is not set"""
+        mask = 0
+        for role_type in role_types:
+            role_type = role_type.lower()
+            if role_type not in self.bits:
+                if not add:
+                    return None
+                self.bits[role_type] = len(self.bits)
+            mask |= 1 << self.bits[role_type]
+        return mask
+
+    def _built(self):
+        if self.classes is None:
+            self._build()
+        return self
+
+    def _select(self, test, mask):
+        if numpy is not None:
+            if self.masks.dtype != object:
+                mask = numpy.uint64(mask)
+            return [self.classes[i] for i in numpy.nonzero(test(self.masks, mask))[0]]
+        return [c for c, m in zip(self.classes, self.masks) if test(m, mask)]
+
+    def contains_all(self, role_types):
+        """Return the classes that have (at least) all of these roles"""
+        mask = self._built().mask(role_types)
+        return [] if mask is None else self._select(lambda masks, mask: masks & mask == mask, mask)
+
+    def exactly(self, role_types):
+        """Return the classes that have all of these roles and no others"""
+        mask = self._built().mask(role_types)
+        return [] if mask is None else self._select(lambda masks, mask: masks == mask, mask)
+
+    def any_of(self, role_types):
+        """Return the classes that have one or more of these roles"""
+        mask = self._built().mask([role_type for role_type in role_types if role_type.lower() in self.bits])
+        return self._select(lambda masks, mask: masks & mask != 0, mask)
+
+    def count(self, role_types):
+        """The number of classes with the rarest of these roles, which is as
+        many as contains_all() (or exactly()) can give at most"""
+        counts = self._built()._counts
+        return min([counts.get(role_type.lower(), 0) for role_type in role_types] or [len(self.classes)])
+
+    def role_types(self, vc):
+        """Return the role types (lowercased) in the mask of a class"""
+        self._built()
+        index = [i for i, c in enumerate(self.classes) if c is vc][0]
+        return sorted([role_type for role_type, bit in self.bits.items() if int(self.masks[index]) >> bit & 1])
+
+    def themroles(self, role_type):
+        """Return the ThematicRoles with a role type, as listed by the classes"""
+        return list(self._built()._roles.get(role_type.lower(), []))
+
+
+class HierarchyIndex(object):
+    """Trie of the numerical class IDs of a VerbNetParser, with an Euler tour
+    numbering. The trie has a node for every numerical ID prefix ("51",
+    "51.3"), the top level classes under the prefix they are numbered in
+    (run-51.3.2 under 51.3), and the subclasses under their class. Every node
+    gets a (pre, post) pair, with pre its place in a preorder walk and post the
+    last pre in its subtree, so a node is under another when its pre falls in
+    the other's span, and the classes under a node are one slice of the classes
+    in preorder.
+
+    Children are in numerical order (51.3.2 before 51.3.10, see natural_key).
+    The trie is built on the first query after the classes changed."""
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.spans = None
+
+    def invalidate(self):
+        self.spans = None
+
+    def _build(self):
+        if self.parser.lazy:
+            self.parser._load_all()
+        children = {"": []}
+        classes = {}
+        self.parents = {}
+
+        def add(key, parent):
+            if key not in children:
+                children[key] = []
+                children[parent].append(key)
+                self.parents[key] = parent
+
+        def add_prefixes(key):
+            if "." in key:
+                parent = key.rsplit(".", 1)[0]
+                add_prefixes(parent)
+                add(parent, parent_prefix(parent))
+
+        def parent_prefix(key):
+            return key.rsplit(".", 1)[0] if "." in key else ""
+
+        def add_subclasses(vc):
+            for sub in vc.subclasses:
+                add(sub.numerical_ID, vc.numerical_ID)
+                classes[sub.numerical_ID] = sub
+                add_subclasses(sub)
+
+        for vc in list(self.parser._file_top_classes.values()):
+            add_prefixes(vc.numerical_ID)
+            add(vc.numerical_ID, parent_prefix(vc.numerical_ID))
+            classes[vc.numerical_ID] = vc
+            add_subclasses(vc)
+
+        self.spans = {}
+        self.order = []
+        self.classes = []
+        # Iterative walk, the tree is not deep but can be wide
+        stack = [("", False)]
+        while stack:
+            key, done = stack.pop()
+            if done:
+                self.spans[key] = (self.spans[key], len(self.order) - 1)
+                continue
+            self.spans[key] = len(self.order)
+            self.order.append(key)
+            self.classes.append(classes.get(key))
+            stack.append((key, True))
+            for child in sorted(children[key], key=natural_key, reverse=True):
+                stack.append((child, False))
+
+    def _built(self):
+        if self.spans is None:
+            self._build()
+        return self
+
+    def span(self, ID):
+        """Return the (pre, post) of a class ID, numerical ID or ID prefix"""
+        self._built()
+        vc = self.parser.verb_classes_dict.get(ID) if "-" in ID and not ID[0].isdigit() else None
+        return self.spans.get(vc.numerical_ID if vc is not None else ID)
+
+    def is_under(self, ID, ancestor_ID):
+        """Whether ID is ancestor_ID or somewhere under it"""
+        span, ancestor = self.span(ID), self.span(ancestor_ID)
+        return span is not None and ancestor is not None and ancestor[0] <= span[0] <= ancestor[1]
+
+    def subtree(self, ID):
+        """Return the classes under ID (a class, numerical ID or prefix, like
+        "51.3"), including ID itself if it is a class, in preorder"""
+        span = self.span(ID)
+        if span is None:
+            return []
+        return [vc for vc in self.classes[span[0]:span[1] + 1] if vc is not None]
+
+    def descendants(self, ID):
+        """Like subtree, without the class ID itself"""
+        span = self.span(ID)
+        if span is None:
+            return []
+        return [vc for vc in self.classes[span[0] + 1:span[1] + 1] if vc is not None]
+
+    def get_class(self, numerical_ID):
+        span = self._built().spans.get(numerical_ID)
+        return None if span is None else self.classes[span[0]]
+
+    def longest_prefix(self, numerical_ID):
+        """Return the class whose numerical ID is the longest prefix of
+        numerical_ID, cut at a "." or "-", like 13.1-1 for 13.1-1-5, or None"""
+        ID = numerical_ID
+        while True:
+            vc = self.get_class(ID)
+            if vc is not None:
+                return vc
+            cut = max(ID.rfind("."), ID.rfind("-"))
+            if cut < 0:
+                return None
+            ID = ID[:cut]
+
+    def class_path(self, vc):
+        """Return the classes from vc up to its top level class"""
+        path = []
+        key = vc.numerical_ID
+        while key in self._built().parents:
+            c = self.get_class(key)
+            # A top level class can be numbered under another one, like 114.2 under 114
+            if c is None or c.top_class_ID != vc.top_class_ID:
+                break
+            path.append(c)
+            key = self.parents[key]
+        return path
+
+    def closest_class(self, numerical_ID, classes):
+        """Of a list of classes, return the one closest to the longest prefix
+        of numerical_ID that is a class: the first (in preorder) under it, or
+        else under its parent class and so on up to the top level class.
+
+        This only walks the top level class the prefix is in, without building
+        the trie, so that a lazy parser only parses the files of the prefixes"""
+        vc, ID = None, numerical_ID
+        while vc is None:
+            vc = self.parser.verb_classes_numerical_dict.get(ID)
+            cut = max(ID.rfind("."), ID.rfind("-"))
+            if vc is None and cut < 0:
+                return None
+            ID = ID[:cut]
+        # A top level class like seem-109 is also the prefix of others (like
+        # 109.1), which do not count here
+        classes = [c for c in classes if c.top_class_ID == vc.top_class_ID]
+        if not classes:
+            return None
+        order, parents = [], {}
+        stack = [self.parser.verb_classes_dict[vc.top_class_ID]]
+        while stack:
+            c = stack.pop()
+            order.append(c)
+            for sub in sorted(c.subclasses, key=lambda sub: natural_key(sub.ID), reverse=True):
+                parents[id(sub)] = c
+                stack.append(sub)
+        rank = dict((id(c), i) for i, c in enumerate(order))
+        ancestor = vc
+        while ancestor is not None:
+            under = [c for c in classes if self._is_below(c, ancestor, parents)]
+            if under:
+                return min(under, key=lambda c: rank.get(id(c), len(order)))
+            ancestor = parents.get(id(ancestor))
+        return None
+
+    @staticmethod
+    def _is_below(vc, ancestor, parents):
+        while vc is not None:
+            if vc is ancestor:
+                return True
+            vc = parents.get(id(vc))
+        return False
+
+
+class RestrictionIndex(object):
+    """Selectional restrictions of the thematic roles, and the restrictions of
+    the syntactic slots, of a VerbNetParser, compiled (see
+    CompiledRestrictions) so that the features of an argument can be checked
+    against all of them at once. Built on first use after the classes changed"""
+
+    def __init__(self, parser):
+        self.parser = parser
+        self._roles = None
+        self._slots = None
+
+    def invalidate(self):
+        self._roles = None
+        self._slots = None
+
+    @property
+    def roles(self):
+        """CompiledRestrictions of the (class, ThematicRole) pairs"""
+        if self._roles is None:
+            items = [(vc, role) for vc in self.parser.get_verb_classes() for role in vc.themroles]
+            self._roles = CompiledRestrictions(items, [role.sel_restrictions for _, role in items])
+        return self._roles
+
+    @property
+    def slots(self):
+        """CompiledRestrictions of the (class, frame, SyntacticRole) triples of
+        the slots that have restrictions"""
+        if self._slots is None:
+            items = [(vc, frame, role) for vc in self.parser.get_verb_classes() for frame in vc.frames
+                     for role in frame.syntax if role.restrictions]
+            self._slots = CompiledRestrictions(items, [role.restriction_tree() for _, _, role in items])
+        return self._slots
+
+    def roles_with(self, feature):
+        """Return the (class, role) pairs whose restrictions mention a feature (like
+        "+animate" or "-region")"""
+        return self.roles.with_feature(feature)
+
+    def slots_with(self, feature):
+        return self.slots.with_feature(feature)
+
+    def count_roles(self, feature):
+        return self.roles.count(feature)
+
+    def count_slots(self, feature):
+        return self.slots.count(feature)
+
+    def check(self, features):
+        """Return the (class, role) pairs whose restrictions allow an argument
+        with these features (like ["animate", "human"])"""
+        return self.roles.check(features)
+
+    def check_many(self, feature_sets):
+        return self.roles.check_many(feature_sets)
+
+
+class CompiledRestrictions(object):
+    """Restriction trees compiled into disjunctive normal form: every tree is a
+    list of clauses, each a bitmask of the features that must be there and one
+    of the features that must not be. The clauses of all trees are kept in
+    arrays (numpy, if it is there), so that checking an argument against every
+    tree is a couple of vectorized bitwise operations"""
+
+    def __init__(self, items, trees):
+        self.items = items
+        self.bits = {}
+        self.clauses = [compile_restrictions(tree) for tree in trees]
+        self._features = {}
+        for item, tree in zip(items, trees):
+            for feature in restriction_features(tree):
+                self._features.setdefault(feature, []).append(item)
+        positive, negative, starts = [], [], []
+        for clauses in self.clauses:
+            starts.append(len(positive))
+            # A tree that can never be satisfied gets a clause that needs a
+            # feature no argument has, so every tree has at least one clause
+            for required, forbidden in clauses or [(["\0"], [])]:
+                positive.append(self.mask(required, add=True))
+                negative.append(self.mask(forbidden, add=True))
+        self.starts = starts
+        if numpy is not None:
+            dtype = numpy.uint64 if len(self.bits) <= 64 else object
+            positive, negative = numpy.array(positive, dtype=dtype), numpy.array(negative, dtype=dtype)
+            self.starts = numpy.array(starts, dtype=numpy.intp)
+        self.positive = positive
+        self.negative = negative
+
+    def mask(self, features, add=False):
+        mask = 0
+        for feature in features:
+            if feature not in self.bits:
+                if not add:
+                    continue
+                self.bits[feature] = len(self.bits)
+            mask |= 1 << self.bits[feature]
+        return mask
+
+    def with_feature(self, feature):
+        return list(self._features.get(feature, []))
+
+    def count(self, feature):
+        """The number of items whose restrictions mention a feature"""
+        return len(self._features.get(feature, ()))
+
+    def allows(self, features):
+        """Return a list of booleans, whether each tree allows an argument with
+        these features"""
+        return self.allows_many([features])[0]
+
+    def allows_many(self, feature_sets):
+        """allows() for a list of feature sets, as one (sets x trees) array of
+        booleans, or a list of lists without numpy"""
+        masks = [self.mask([feature.lstrip("+") for feature in features]) for features in feature_sets]
+        if numpy is None:
+            return [[bool([i for i in range(start, end) if m & self.positive[i] == self.positive[i]
+                           and not m & self.negative[i]])
+                     for start, end in zip(self.starts, self.starts[1:] + [len(self.positive)])]
+                    for m in masks]
+        masks = numpy.array(masks, dtype=self.positive.dtype)[:, None]
+        if not len(self.items):
+            return numpy.zeros((len(masks), 0), dtype=bool)
+        matches = (masks & self.positive == self.positive) & (masks & self.negative == 0)
+        return numpy.logical_or.reduceat(matches, self.starts, axis=1)
+
+    def check(self, features):
+        """Return the items whose restrictions allow these features"""
+        return [item for item, allowed in zip(self.items, self.allows(features)) if allowed]
+
+    def check_many(self, feature_sets):
+        """check() for a list of feature sets, returning a list of lists"""
+        return [[item for item, allowed in zip(self.items, row) if allowed]
+                for row in self.allows_many(feature_sets)]
+
+
+def compile_restrictions(tree):
+    """Turn a restriction tree (like ThematicRole.sel_restrictions, e.g.
+    ['OR', ['+', 'animate'], ['+', 'organization']]) into a list of clauses
+    (required features, forbidden features), any one of which is enough. No
+    restrictions at all give one empty clause"""
+    if not tree:
+        return [((), ())]
+    if tree[0] in ("OR", "AND"):
+        children = [compile_restrictions(child) for child in tree[1:] if child is not None]
+        if not children:
+            return [((), ())]
+        if tree[0] == "OR":
+            return [clause for clauses in children for clause in clauses]
+        clauses = [((), ())]
+        for child in children:
+            clauses = [(required + more_required, forbidden + more_forbidden)
+                       for required, forbidden in clauses for more_required, more_forbidden in child]
+        return [(tuple(sorted(set(required))), tuple(sorted(set(forbidden)))) for required, forbidden in clauses
+                if not set(required) & set(forbidden)]
+    # A leaf, a list of (Value, type) pairs that all have to hold
+    pairs = [tree[i:i + 2] for i in range(0, len(tree), 2)]
+    required = tuple([feature for value, feature in pairs if value == "+"])
+    forbidden = tuple([feature for value, feature in pairs if value == "-"])
+    return [] if set(required) & set(forbidden) else [(required, forbidden)]
+
+
+def restriction_features(tree):
+    """The features of a restriction tree, with their sign (like "+animate")"""
+    if not tree:
+        return []
+    if tree[0] in ("OR", "AND"):
+        return [feature for child in tree[1:] if child for feature in restriction_features(child)]
+    return [tree[i] + tree[i + 1] for i in range(0, len(tree), 2)]
+
+
+def restrictions_allow(tree, features):
+    """Whether an argument with these features satisfies a restriction tree"""
+    features = set([feature.lstrip("+") for feature in features])
+    return bool([required for required, forbidden in compile_restrictions(tree)
+                 if set(required) <= features and not set(forbidden) & features])
+
+
+def natural_key(ID):
+    """Sort key for (numerical) class IDs, comparing the parts of the number as
+    numbers, so that 9.10 comes after 9.9"""
+    numerical_ID = ID if ID[:1].isdigit() or not ID else "-".join(ID.split("-")[1:])
+    return [(0, int(part)) if part.isdigit() else (1, part) for part in re.split(r"[.-]", numerical_ID)]
+
+
+def sort_classes(classes):
+    """Sort classes (or class IDs) by their number, see natural_key"""
+    return sorted(classes, key=lambda vc: natural_key(vc if isinstance(vc, str) else vc.ID))
+
+
+def inherited_themroles(vc, subclass):
+    """The thematic roles of subclass, a class under (or equal to) the top level
+    class vc. A subclass only lists the roles that differ from its parent, so
+    these are the roles on the way down from vc, with the roles of a subclass
+    replacing those of the same type above it"""
+    def path(c):
+        if c is subclass:
+            return [c]
+        for sub in c.subclasses:
+            below = path(sub)
+            if below:
+                return [c] + below
+        return []
+
+    roles = []
+    for c in path(vc):
+        types = set([role.role_type for role in c.themroles])
+        roles = [role for role in roles if role.role_type not in types] + list(c.themroles)
+    return roles
+
+
+def parse_sense_key(sense_key):
+    """Parse a WordNet sense key like "deal%2:40:01" into the tuple
+    ("deal", 2, 40, 1) of its lemma, ss_type, lex_filenum and lex_id. A leading
+    "?", which VerbNet uses for uncertain senses, and the head word fields are
+    ignored. Returns None for something that is not a sense key"""
+    lemma, _, lex_sense = sense_key.lstrip("?").partition("%")
+    fields = lex_sense.split(":")
+    try:
+        return lemma, int(fields[0]), int(fields[1]), int(fields[2])
+    except (ValueError, IndexError):
+        return None
+
+
+def parse_sense_keys(sense_keys):
+    """Parse a list of sense keys, leaving out the ones that do not parse"""
+    senses = [parse_sense_key(key) for key in sense_keys]
+    return tuple([sense for sense in senses if sense is not None])
+
+
+def unique_classes(frames):
+    """The classes of a list of (class, frame) pairs, in order, once each"""
+    classes = []
+    seen = set()
+    for vc, _ in frames:
+        if id(vc) not in seen:
+            seen.add(id(vc))
+            classes.append(vc)
+    return classes
+
+
+class PredicateIndex(FrameIndex):
+    """FrameIndex of the predicate values (like "motion") of each frame"""
+
+    name = "predicates"
+
+    def frame_keys(self, frame):
+        return set([p.value[0] for p in frame.predicates if p.value])
+
+    values = FrameIndex.keys
+
+
+class ArgumentIndex(FrameIndex):
+    """FrameIndex of the (type, value) pairs of the ARGs of each frame, like
+    ("Constant", "ch_of_state"). Besides exact lookups, values can be searched
+    for by substring: every distinct value is indexed by its trigrams, so a
+    query only has to check the values that have all trigrams of the query"""
+
+    name = "arguments"
+
+    def __init__(self):
+        FrameIndex.__init__(self)
+        # value -> set of types it occurs with, and trigram -> set of values
+        self._types = {}
+        self._trigrams = {}
+        # Results of find_frames() and of frame_matches(), per query
+        self._queries = {}
+        self._query_frames = {}
+
+    def frame_keys(self, frame):
+        return set([tuple(argtype) for p in frame.predicates for argtype in p.argtypes])
+
+    def _changed(self, key):
+        FrameIndex._changed(self, key)
+        arg_type, value = key
+        self._queries.clear()
+        self._query_frames.clear()
+        if key in self._postings:
+            if value not in self._types:
+                for trigram in trigrams(value):
+                    self._trigrams.setdefault(trigram, set()).add(value)
+            self._types.setdefault(value, set()).add(arg_type)
+        elif value in self._types:
+            self._types[value].discard(arg_type)
+            if not self._types[value]:
+                del self._types[value]
+                for trigram in trigrams(value):
+                    self._trigrams[trigram].discard(value)
+                    if not self._trigrams[trigram]:
+                        del self._trigrams[trigram]
+
+    def values(self, value, contains=False):
+        """Return the distinct ARG values equal to value, or with value in them"""
+        if not contains:
+            return [value] if value in self._types else []
+        grams = trigrams(value)
+        if not grams:
+            # Too short to have trigrams, there are few enough distinct values to check them all
+            return sorted([v for v in self._types if value in v])
+        candidates = set.intersection(*[self._trigrams.get(gram, set()) for gram in grams])
+        return sorted([v for v in candidates if value in v])
+
+    def find_frames(self, value, arg_type=None, contains=False):
+        """Return [(class, frame), ...] for the frames with an ARG whose value is
+        value, or contains it, optionally only for ARGs of type arg_type"""
+        query = (value, arg_type, contains)
+        if query not in self._queries:
+            entries = {}
+            for v in self.values(value, contains):
+                for t in self._types[v]:
+                    if arg_type is None or t == arg_type:
+                        entries.update(self._postings[(t, v)])
+            entries = sorted(entries.values(), key=lambda entry: entry[0])
+            self._queries[query] = [(vc, frame) for _, vc, frame, _ in entries]
+        return self._queries[query]
+
+    def count_frames(self, value, arg_type=None, contains=False):
+        """How many frames find_frames() can give at most: the frames of each
+        (type, value) it would go through, added up"""
+        return sum([self.count((t, v)) for v in self.values(value, contains) for t in self._types[v]
+                    if arg_type is None or t == arg_type])
+
+    def find_classes(self, value, arg_type=None, contains=False):
+        return unique_classes(self.find_frames(value, arg_type, contains))
+
+    def frame_matches(self, frame, value, arg_type=None, contains=False):
+        """Whether a frame is one of find_frames(value, arg_type, contains)"""
+        query = (value, arg_type, contains)
+        if query not in self._query_frames:
+            self._query_frames[query] = set([id(f) for _, f in self.find_frames(value, arg_type, contains)])
+        return id(frame) in self._query_frames[query]
+
+
+class FramePatternIndex(FrameIndex):
+    """FrameIndex of the syntactic patterns of each frame: its sequence of POS
+    (like ("NP", "VERB", "NP")), its primary and secondary descriptions (like
+    "NP V NP PP.recipient"), and the multiset of its (POS, value) pairs.
+
+    The distinct POS sequences and primary descriptions are also indexed by
+    their tokens, so that containing() and subsequence() only have to check
+    the sequences that have all the tokens of the query. Description tokens
+    like "PP.recipient" are indexed under "PP" too, so "PP" matches any PP."""
+
+    name = "patterns"
+
+    def __init__(self):
+        FrameIndex.__init__(self)
+        # (kind, token) -> set of keys of that kind with the token
+        self._tokens = {}
+        self._queries = {}
+
+    def frame_keys(self, frame):
+        roles = sorted([(role.POS, " ".join(role.value)) for role in frame.syntax])
+        return set([("pos", tuple([role.POS for role in frame.syntax])),
+                    ("primary", " ".join(frame.primary)),
+                    ("secondary", " ".join(frame.secondary)),
+                    ("roles", tuple(roles))])
+
+    def _changed(self, key):
+        FrameIndex._changed(self, key)
+        self._queries.clear()
+        kind = key[0]
+        if kind not in ("pos", "primary"):
+            return
+        tokens = set()
+        for token in sequence_tokens(key[1]):
+            tokens.update([token, token.split(".")[0]])
+        for token in tokens:
+            keys = self._tokens.setdefault((kind, token), set())
+            if key in self._postings:
+                keys.add(key)
+            else:
+                keys.discard(key)
+                if not keys:
+                    del self._tokens[(kind, token)]
+
+    def pos(self, sequence):
+        """Return [(class, frame), ...] for the frames with exactly this
+        sequence of POS, given as a list or as a string like "NP VERB NP"."""
+        return self.frames(("pos", tuple([POS.upper() for POS in sequence_tokens(sequence)])))
+
+    def primary(self, description):
+        return self.frames(("primary", " ".join(sequence_tokens(description))))
+
+    def secondary(self, description):
+        return self.frames(("secondary", " ".join(sequence_tokens(description))))
+
+    def roles(self, pairs):
+        """Return the frames whose syntax has exactly these (POS, value) pairs,
+        in any order, with a value like "Agent" or "" for no value"""
+        return self.frames(("roles", tuple(sorted([(POS, value) for POS, value in pairs]))))
+
+    def containing(self, tokens, kind="pos", only=False):
+        """Return the frames whose POS sequence (or primary description) has all
+        of these tokens, as many times as they are given, or, with only, has
+        these tokens and nothing else. POS are compared without case"""
+        tokens = [token.upper() for token in tokens] if kind == "pos" else list(tokens)
+        query = ("containing", kind, tuple(sorted(tokens)), only)
+        if query not in self._queries:
+            def matches(sequence):
+                counts = dict((token, 0) for token in tokens)
+                for token in sequence:
+                    for t in set([token, token.split(".")[0]]):
+                        if t in counts:
+                            counts[t] += 1
+                            break
+                    else:
+                        if only:
+                            return False
+                if only and len(sequence) != len(tokens):
+                    return False
+                return not [t for t in set(tokens) if counts[t] < tokens.count(t)]
+            self._queries[query] = self._select(kind, tokens, matches)
+        return self._queries[query]
+
+    def within(self, tokens, only=False):
+        """Return the frames whose POS are all among these tokens (compared
+        without case), or, with only, that also have as many POS as there are
+        tokens. This is what search_by_POS asks for"""
+        allowed = set([token.upper() for token in tokens])
+        query = ("within", tuple(sorted(allowed)), len(tokens) if only else None)
+        if query not in self._queries:
+            def matches(sequence):
+                if only and len(sequence) != len(tokens):
+                    return False
+                return not [token for token in sequence if token.upper() not in allowed]
+            self._queries[query] = self._select("pos", [], matches)
+        return self._queries[query]
+
+    def subsequence(self, pattern, kind="primary"):
+        """Return the frames whose primary description (or POS sequence) has
+        the segments of pattern in order, each segment as contiguous tokens,
+        with anything in between. pattern is a list of segments, or a string
+        with "..." between the segments, like "NP V NP ... PP". A token without
+        a dot matches the tokens that start with it and a dot, so "PP" matches
+        "PP.recipient"."""
+        if isinstance(pattern, str):
+            pattern = [segment.split() for segment in pattern.split("...")]
+        else:
+            pattern = [sequence_tokens(segment) for segment in pattern]
+        pattern = [[token.upper() for token in segment] if kind == "pos" else segment
+                   for segment in pattern if segment]
+        query = ("subsequence", kind, tuple([tuple(segment) for segment in pattern]))
+        if query not in self._queries:
+            def matches(sequence):
+                position = 0
+                for segment in pattern:
+                    position = find_segment(sequence, segment, position)
+                    if position < 0:
+                        return False
+                return True
+            self._queries[query] = self._select(kind, [token for segment in pattern for token in segment], matches)
+        return self._queries[query]
+
+    def count_tokens(self, tokens, kind="pos"):
+        """How many frames containing() or subsequence() can give at most for
+        these tokens: the frames of the rarest token. The frames per token are
+        kept until the index changes"""
+        tokens = set([token.upper() for token in tokens] if kind == "pos" else tokens)
+        counts = []
+        for token in tokens:
+            query = ("count", kind, token)
+            if query not in self._queries:
+                self._queries[query] = sum([self.count(key) for key in self._tokens.get((kind, token), ())])
+            counts.append(self._queries[query])
+        return min(counts or [len(self._frames)])
+
+    def _select(self, kind, tokens, matches):
+        """The frames for the keys of a kind that have all tokens and match"""
+        if tokens:
+            candidates = set.intersection(*[self._tokens.get((kind, token), set()) for token in set(tokens)])
+        else:
+            candidates = [key for key in self._postings if key[0] == kind]
+        entries = {}
+        for key in candidates:
+            if matches(sequence_tokens(key[1])):
+                entries.update(self._postings[key])
+        entries = sorted(entries.values(), key=lambda entry: entry[0])
+        return [(vc, frame) for _, vc, frame, _ in entries]
+
+
+def sequence_tokens(sequence):
+    return sequence.split() if isinstance(sequence, str) else list(sequence)
+
+
+def find_segment(sequence, segment, start=0):
+    """Return the position just after the first occurrence of segment in
+    sequence at or after start, or -1"""
+    for i in range(start, len(sequence) - len(segment) + 1):
+        if not [j for j, token in enumerate(segment)
+                if sequence[i + j] != token and sequence[i + j].split(".")[0] != token]:
+            return i + len(segment)
+    return -1
+
+
+class ExampleIndex(FrameIndex):
+    """Full text index of the examples of each frame, keyed by their
+    (lowercased) words, with the words of every example kept in order for
+    phrase queries. All examples of a frame count as one document for the BM25
+    ranking of search()"""
+
+    name = "examples"
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        FrameIndex.__init__(self)
+        # id(frame) -> [words of each example], and -> {word: count}
+        self._texts = {}
+        self._counts = {}
+        self._length = 0
+        self._vocabulary = None
+
+    def frame_keys(self, frame):
+        return set(self._counts[id(frame)])
+
+    def add_frame(self, vc, frame, seq=None):
+        texts = [example_words(example) for example in frame.examples]
+        counts = {}
+        for word in [word for words in texts for word in words]:
+            counts[word] = counts.get(word, 0) + 1
+        self._texts[id(frame)], self._counts[id(frame)] = texts, counts
+        self._length += sum([len(words) for words in texts])
+        FrameIndex.add_frame(self, vc, frame, seq)
+
+    def remove_frame(self, frame):
+        entry = FrameIndex.remove_frame(self, frame)
+        if entry is not None:
+            self._length -= sum([len(words) for words in self._texts.pop(id(frame))])
+            del self._counts[id(frame)]
+        return entry
+
+    def _changed(self, key):
+        FrameIndex._changed(self, key)
+        self._vocabulary = None
+
+    def words(self, prefix=""):
+        """Return the indexed words that start with prefix, sorted"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = start
+        while end < len(self._vocabulary) and self._vocabulary[end].startswith(prefix):
+            end += 1
+        return self._vocabulary[start:end]
+
+    def phrase(self, phrase):
+        """Return [(class, frame), ...] for the frames with an example that has
+        the words of phrase in a row, none for a phrase without words"""
+        return [(entry[1], entry[2]) for entry in self._entries(self._term(example_words(phrase, True)))]
+
+    def prefix(self, prefix):
+        """Return [(class, frame), ...] for the frames with an example that has
+        a word starting with prefix"""
+        return [(entry[1], entry[2]) for entry in self._entries(self._term([(prefix.lower(), True)]))]
+
+    def search(self, query, match="all", classes=None, frames=None, limit=None):
+        """Return [(score, class, frame), ...] for the frames whose examples
+        match query, ranked by BM25, best first. The query is made of words
+        (where "word*" stands for any word starting with "word") and of "quoted
+        phrases", and frames have to match all of them (match="all") or any of
+        them (match="any"). Results can be kept to the frames of a list of
+        classes and to a list of frames"""
+        terms = [example_words(term, True) for term in parse_example_query(query)]
+        terms = [term for term in terms if term]
+        if not terms:
+            return []
+        matches = [self._term(term) for term in terms]
+        if match == "all":
+            ids = set.intersection(*matches)
+        elif match == "any":
+            ids = set.union(*matches)
+        else:
+            raise Exception("match should be all or any, not %s" % match)
+        if classes is not None:
+            class_ids = set([id(c) for c in classes])
+            ids = set([i for i in ids if id(self._frames[i][1]) in class_ids])
+        if frames is not None:
+            ids &= set([id(frame) for frame in frames])
+        words = set([word for term in terms for token in term for word in self._expand(token)])
+        results = sorted([(-self._score(i, words), self._frames[i]) for i in ids], key=lambda r: (r[0], r[1][0]))
+        return [(-score, entry[1], entry[2]) for score, entry in results[:limit]]
+
+    def count_query(self, query):
+        """How many frames search(query) can give at most with match="all":
+        the frames of its rarest word (or word* prefix)"""
+        tokens = [token for term in parse_example_query(query) for token in example_words(term, True)]
+        if not tokens:
+            return 0
+        return min([min(len(self._frames), sum([self.count(word) for word in self._expand(token)]))
+                    for token in tokens])
+
+    def _expand(self, token):
+        word, is_prefix = token
+        return self.words(word) if is_prefix else [word] if word in self._postings else []
+
+    def _term(self, term):
+        # The ids of the frames with the words of a term in a row, checking the
+        # order only for the frames that have all of them
+        if not term:
+            return set()
+        alternatives = [set(self._expand(token)) for token in term]
+        ids = None
+        for words in alternatives:
+            found = set()
+            for word in words:
+                found.update(self._postings[word])
+            ids = found if ids is None else ids & found
+        if len(term) == 1:
+            return ids
+        return set([i for i in ids if [words for words in self._texts[i]
+                                       if find_phrase(words, alternatives)]])
+
+    def _entries(self, ids):
+        return sorted([self._frames[i] for i in ids], key=lambda entry: entry[0])
+
+    def _score(self, i, words):
+        counts = self._counts[i]
+        length = sum(counts.values())
+        average = float(self._length) / max(1, len(self._frames))
+        score = 0.0
+        for word in words:
+            tf = counts.get(word, 0)
+            if tf:
+                df = len(self._postings[word])
+                idf = math.log(1 + (len(self._frames) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / average))
+        return score
+
+
+def example_words(text, query=False):
+    """The lowercased words of an example. For a query, return (word, prefix)
+    pairs, with prefix True for words written like "word*"."""
+    if not query:
+        return re.findall(r"[a-z0-9]+(?:'[a-z]+)?", text.lower())
+    return [(word.rstrip("*"), word.endswith("*"))
+            for word in re.findall(r"[a-z0-9]+(?:'[a-z]+)?\*?", text.lower())]
+
+
+def parse_example_query(query):
+    """Split a query into its "quoted phrases" and its other words"""
+    return [phrase or word for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query)]
+
+
+def find_phrase(words, alternatives):
+    """Whether words has a run of words, each in the set of alternatives at its
+    place"""
+    for i in range(len(words) - len(alternatives) + 1):
+        if not [j for j, allowed in enumerate(alternatives) if words[i + j] not in allowed]:
+            return True
+    return False
+
+
+def trigrams(value):
+    return set([value[i:i + 3] for i in range(len(value) - 2)])
@@ -0,0 +1,503 @@
+"""query.py
+
+Composable queries over the indexes of a VerbNetParser. Filters on members,
+thematic roles, predicates, ARGs, syntax, selectional restrictions, examples
+and the class hierarchy are combined with & (AND), | (OR) and ~ (NOT):
+
+    q = HasPredicate("motion") & HasRole(["Agent", "Theme"]) & ~HasMember(name="run")
+    q.classes(vn)           # the (sub)classes that match
+    q.frames(vn)            # [(class, frame), ...] for the frames that match
+    print(q.explain(vn))    # the plan, with what each step found and took
+
+Every class and frame gets an integer ID (classes in the preorder of the class
+hierarchy, frames in the order of their classes), so that every filter gives a
+sorted posting list of IDs. An AND starts with its most selective filter,
+intersects the others into it from the smallest up, and stops as soon as
+nothing is left.
+
+Queries are answered for classes or for frames. A class filter (like
+HasMember) matches all frames of the classes it matches, and a frame filter
+(like HasPredicate) matches the classes that list a frame it matches, so
+HasPredicate("motion") & HasSyntax("NP V PP") asks for frames that have both,
+and not for classes that have one frame with each.
+
+"""
+
+import bisect
+import heapq
+import time
+from verbnet import *
+
+
+class QueryCatalog(object):
+    """The integer IDs of the classes and frames of a VerbNetParser. Classes are
+    numbered in the preorder of vn.hierarchy, which puts every subtree in one
+    range of IDs, and the frames of a class have consecutive IDs"""
+
+    def __init__(self, vn):
+        self.vn = vn
+        self.spans = vn.hierarchy._built().spans
+        self.classes = [c for c in vn.hierarchy.classes if c is not None]
+        self.class_ids = dict((id(c), i) for i, c in enumerate(self.classes))
+        self.frames = []
+        self.frame_ids = {}
+        self.frame_class = []
+        self.class_frames = []
+        for i, c in enumerate(self.classes):
+            start = len(self.frames)
+            for frame in c.frames:
+                self.frame_ids[id(frame)] = len(self.frames)
+                self.frames.append((c, frame))
+                self.frame_class.append(i)
+            self.class_frames.append((start, len(self.frames)))
+
+    def size(self, level):
+        return len(self.classes) if level == "classes" else len(self.frames)
+
+    def class_postings(self, classes):
+        return sorted(set([self.class_ids[id(c)] for c in classes if id(c) in self.class_ids]))
+
+    def frame_postings(self, frames):
+        return sorted(set([self.frame_ids[id(frame)] for _, frame in frames if id(frame) in self.frame_ids]))
+
+    def convert(self, postings, level, to_level):
+        """Move a posting list from one level to the other"""
+        if level == to_level:
+            return postings
+        if to_level == "classes":
+            return sorted(set([self.frame_class[i] for i in postings]))
+        return [i for c in postings for i in range(*self.class_frames[c])]
+
+    def results(self, postings, level):
+        if level == "classes":
+            return [self.classes[i] for i in postings]
+        return [self.frames[i] for i in postings]
+
+
+def get_catalog(vn):
+    """The QueryCatalog of a parser, rebuilt when its hierarchy was (which
+    happens whenever its classes changed). The catalog is kept on the parser,
+    so that it goes away with it"""
+    catalog = getattr(vn, "_query_catalog", None)
+    if catalog is None or catalog.spans is not vn.hierarchy._built().spans:
+        catalog = vn._query_catalog = QueryCatalog(vn)
+    return catalog
+
+
+def intersect(a, b):
+    """Intersection of two sorted posting lists. Every ID of the shorter list is
+    looked for in the longer one with a binary search that starts where the
+    last one ended"""
+    if len(a) > len(b):
+        a, b = b, a
+    result = []
+    position = 0
+    for i in a:
+        position = bisect.bisect_left(b, i, position)
+        if position == len(b):
+            break
+        if b[position] == i:
+            result.append(i)
+    return result
+
+
+def union(lists):
+    """Union of sorted posting lists, as one sorted list"""
+    result = []
+    for i in heapq.merge(*lists):
+        if not result or result[-1] != i:
+            result.append(i)
+    return result
+
+
+def difference(a, b):
+    """The IDs of sorted list a that are not in sorted list b"""
+    exclude = set(b)
+    return [i for i in a if i not in exclude]
+
+
+class Plan(object):
+    """One run of a query: the catalog and level it runs at, the posting lists
+    of the filters (found once per run), and one step per node that was
+    evaluated, in the order they were, with its estimate, the number of IDs it
+    gave and how long estimating and evaluating it took"""
+
+    def __init__(self, catalog, level):
+        self.catalog = catalog
+        self.level = level
+        self.steps = []
+        self.found = {}
+        self._estimates = {}
+
+    def size(self, level=None):
+        return self.catalog.size(level or self.level)
+
+    def estimate(self, node):
+        if id(node) not in self._estimates:
+            start = time.perf_counter()
+            estimate = node.estimate(self)
+            self._estimates[id(node)] = (estimate, time.perf_counter() - start)
+        return self._estimates[id(node)][0]
+
+    def step(self, depth, node):
+        step = {"depth": depth, "node": node, "estimate": self.estimate(node), "count": None, "seconds": None,
+                "start": time.perf_counter()}
+        self.steps.append(step)
+        return step
+
+    def done(self, step, postings):
+        step["count"] = len(postings)
+        step["seconds"] = time.perf_counter() - step.pop("start")
+
+    def skip(self, depth, node):
+        self.steps.append({"depth": depth, "node": node, "estimate": self.estimate(node), "count": None,
+                           "seconds": None})
+
+    def __str__(self):
+        lines = []
+        for step in self.steps:
+            estimating = self._estimates[id(step["node"])][1] * 1000
+            if step["seconds"] is None:
+                result = "skipped"
+            else:
+                result = "%d %s, %.3f ms" % (step["count"], self.level, step["seconds"] * 1000)
+            lines.append("%s%s  (estimate %s, %.3f ms) -> %s" % ("  " * step["depth"], step["node"].label(),
+                                                                 step["estimate"], estimating, result))
+        return "\n".join(lines)
+
+
+class Query(object):
+    """Base class of all queries"""
+
+    def __and__(self, other):
+        return And([self, other])
+
+    def __or__(self, other):
+        return Or([self, other])
+
+    def __invert__(self):
+        return Not(self)
+
+    def classes(self, vn):
+        """Return the (sub)classes that match, in the order of the hierarchy"""
+        return self.run(vn, "classes")[0]
+
+    def frames(self, vn):
+        """Return [(class, frame), ...] for the frames that match"""
+        return self.run(vn, "frames")[0]
+
+    def run(self, vn, level="classes"):
+        """Return the results and the Plan of the query"""
+        if level not in ("classes", "frames"):
+            raise Exception("level should be classes or frames, not %s" % level)
+        if vn.lazy:
+            vn._load_all()
+        plan = Plan(get_catalog(vn), level)
+        postings = self.evaluate(plan, 0)
+        return plan.catalog.results(postings, level), plan
+
+    def explain(self, vn, level="classes"):
+        """Run the query, and return its plan with the per-step timings"""
+        return str(self.run(vn, level)[1])
+
+    def evaluate(self, plan, depth):
+        step = plan.step(depth, self)
+        postings = self.postings(plan, depth)
+        plan.done(step, postings)
+        return postings
+
+    def estimate(self, plan):
+        raise NotImplementedError
+
+    def postings(self, plan, depth):
+        raise NotImplementedError
+
+    def label(self):
+        return self.__class__.__name__
+
+
+class And(Query):
+
+    def __init__(self, queries):
+        # (a & b) & c becomes one AND of three
+        self.queries = [q for query in queries for q in (query.queries if isinstance(query, And) else [query])]
+
+    def estimate(self, plan):
+        return min([plan.estimate(q) for q in self.queries if not isinstance(q, Not)] or [plan.size()])
+
+    def postings(self, plan, depth):
+        positive = sorted([(plan.estimate(q), i, q) for i, q in enumerate(self.queries)
+                           if not isinstance(q, Not)], key=lambda t: t[:2])
+        negative = sorted([(plan.estimate(q.query), i, q) for i, q in enumerate(self.queries)
+                           if isinstance(q, Not)], key=lambda t: t[:2])
+        postings = None if positive else list(range(plan.size()))
+        for n, (_, _, query) in enumerate(positive):
+            if postings is not None and not postings:
+                for _, _, query in positive[n:]:
+                    plan.skip(depth + 1, query)
+                break
+            found = query.evaluate(plan, depth + 1)
+            postings = found if postings is None else intersect(postings, found)
+        # NOT children only take IDs away, the largest first
+        for _, _, query in reversed(negative):
+            if not postings:
+                plan.skip(depth + 1, query)
+                continue
+            step = plan.step(depth + 1, query)
+            postings = difference(postings, query.query.evaluate(plan, depth + 2))
+            plan.done(step, postings)
+        return postings
+
+    def label(self):
+        return "AND"
+
+
+class Or(Query):
+
+    def __init__(self, queries):
+        self.queries = [q for query in queries for q in (query.queries if isinstance(query, Or) else [query])]
+
+    def estimate(self, plan):
+        return min(plan.size(), sum([plan.estimate(q) for q in self.queries]))
+
+    def postings(self, plan, depth):
+        return union([q.evaluate(plan, depth + 1) for q in self.queries])
+
+    def label(self):
+        return "OR"
+
+
+class Not(Query):
+
+    def __init__(self, query):
+        self.query = query
+
+    def estimate(self, plan):
+        return plan.size() - plan.estimate(self.query)
+
+    def postings(self, plan, depth):
+        return difference(list(range(plan.size())), self.query.evaluate(plan, depth + 1))
+
+    def __invert__(self):
+        return self.query
+
+    def label(self):
+        return "NOT"
+
+
+class Filter(Query):
+    """A query answered by one index. Subclasses find the posting list at
+    their own level (classes or frames), and give a cheap count where they
+    can; by default the estimate is the length of the posting list itself,
+    which is then kept for the rest of the run"""
+
+    level = "classes"
+
+    def find(self, catalog):
+        raise NotImplementedError
+
+    def count(self, plan):
+        return len(self.native(plan))
+
+    def estimate(self, plan):
+        # Scaled by the average number of frames per class when the query is
+        # answered at the other level
+        count = min(self.count(plan), plan.size(self.level))
+        if self.level == plan.level:
+            return count
+        return min(plan.size(), int(round(count * float(plan.size()) / max(1, plan.size(self.level)))))
+
+    def postings(self, plan, depth):
+        return plan.catalog.convert(self.native(plan), self.level, plan.level)
+
+    def native(self, plan):
+        if id(self) not in plan.found:
+            plan.found[id(self)] = self.find(plan.catalog)
+        return plan.found[id(self)]
+
+    def label(self):
+        args = ", ".join(["%s=%r" % (k, v) for k, v in sorted(self.__dict__.items())
+                          if not k.startswith("_") and v not in (None, False)])
+        return "%s(%s)" % (self.__class__.__name__, args)
+
+
+class HasMember(Filter):
+    """Classes that list a member with a name, a WordNet sense key (wn), a
+    PropBank roleset (grouping), a feature, exactly a set of features, or a
+    FrameNet frame in its fn_mapping. Every argument given has to hold for the
+    same member"""
+
+    def __init__(self, name=None, wn=None, grouping=None, feature=None, features=None, fn_frame=None):
+        self.name = name
+        self.wn = wn
+        self.grouping = grouping
+        self.feature = feature
+        self.features = features
+        self.fn_frame = fn_frame
+
+    def _lookups(self, vn):
+        lookups = []
+        if self.name is not None:
+            lookups.append(lambda: vn.member_index.get(self.name, []))
+        if self.wn is not None:
+            lookups.append(lambda: vn.sense_index.lookup(self.wn))
+        if self.grouping is not None:
+            lookups.append(lambda: vn.roleset_index.lookup(self.grouping))
+        if self.feature is not None:
+            lookups.append(lambda: vn.feature_index.lookup(self.feature))
+        if self.features is not None:
+            lookups.append(lambda: vn.feature_index.exactly(self.features))
+        if self.fn_frame is not None:
+            lookups.append(lambda: vn.framenet_index.lookup(self.fn_frame))
+        if not lookups:
+            raise Exception("HasMember needs at least one of name, wn, grouping, feature, features or fn_frame")
+        return lookups
+
+    def count(self, plan):
+        return min([len(lookup()) for lookup in self._lookups(plan.catalog.vn)])
+
+    def find(self, catalog):
+        entries = None
+        for lookup in sorted(self._lookups(catalog.vn), key=lambda lookup: len(lookup())):
+            found = set([id(m) for _, _, m in lookup()])
+            entries = [e for e in lookup()] if entries is None else [e for e in entries if id(e[2]) in found]
+        return catalog.class_postings([c for _, c, _ in entries])
+
+
+class HasRole(Filter):
+    """Classes with all of these thematic roles, counting the roles they
+    inherit, or (with only) with these roles and no others"""
+
+    def __init__(self, roles, only=False):
+        self.roles = [roles] if isinstance(roles, str) else list(roles)
+        self.only = only
+
+    def count(self, plan):
+        return plan.catalog.vn.themrole_index.count(self.roles)
+
+    def find(self, catalog):
+        index = catalog.vn.themrole_index
+        return catalog.class_postings(index.exactly(self.roles) if self.only else index.contains_all(self.roles))
+
+
+class HasPredicate(Filter):
+    """Frames with a predicate value (like "motion")"""
+
+    level = "frames"
+
+    def __init__(self, value):
+        self.value = value
+
+    def count(self, plan):
+        return plan.catalog.vn.predicate_index.count(self.value)
+
+    def find(self, catalog):
+        return catalog.frame_postings(catalog.vn.predicate_index.frames(self.value))
+
+
+class HasArgument(Filter):
+    """Frames with an ARG whose value is value (or contains it), optionally
+    only ARGs of one type, like ("Constant", "ch_of_state")"""
+
+    level = "frames"
+
+    def __init__(self, value, arg_type=None, contains=False):
+        self.value = value
+        self.arg_type = arg_type
+        self.contains = contains
+
+    def count(self, plan):
+        return plan.catalog.vn.argument_index.count_frames(self.value, self.arg_type, self.contains)
+
+    def find(self, catalog):
+        return catalog.frame_postings(catalog.vn.argument_index.find_frames(self.value, self.arg_type, self.contains))
+
+
+class HasSyntax(Filter):
+    """Frames with a syntactic pattern: a primary description with the
+    segments of pattern in order, like "NP V NP ... PP" (see
+    FramePatternIndex.subsequence), or, with pos, exactly this POS sequence,
+    or, with tokens, all of these POS (see FramePatternIndex.containing)"""
+
+    level = "frames"
+
+    def __init__(self, pattern=None, pos=None, tokens=None, only=False):
+        self.pattern = pattern
+        self.pos = pos
+        self.tokens = tokens
+        self.only = only
+
+    def count(self, plan):
+        index = plan.catalog.vn.pattern_index
+        if self.pos is not None:
+            return index.count(("pos", tuple([POS.upper() for POS in sequence_tokens(self.pos)])))
+        if self.tokens is not None:
+            return index.count_tokens(self.tokens)
+        if isinstance(self.pattern, str):
+            return index.count_tokens(self.pattern.replace("...", " ").split(), "primary")
+        return index.count_tokens([token for segment in self.pattern for token in sequence_tokens(segment)],
+                                  "primary")
+
+    def find(self, catalog):
+        index = catalog.vn.pattern_index
+        if self.pos is not None:
+            return catalog.frame_postings(index.pos(self.pos))
+        if self.tokens is not None:
+            return catalog.frame_postings(index.containing(self.tokens, only=self.only))
+        return catalog.frame_postings(index.subsequence(self.pattern))
+
+
+class HasRestriction(Filter):
+    """Classes with a thematic role whose selectional restrictions mention a
+    feature (like "+animate"), or, with slot, frames with a syntactic slot whose
+    restrictions do"""
+
+    def __init__(self, feature, slot=False):
+        self.feature = feature
+        self.slot = slot
+
+    @property
+    def level(self):
+        return "frames" if self.slot else "classes"
+
+    def count(self, plan):
+        # The number of roles or slots, more than the classes or frames they are in
+        index = plan.catalog.vn.restriction_index
+        return index.count_slots(self.feature) if self.slot else index.count_roles(self.feature)
+
+    def find(self, catalog):
+        index = catalog.vn.restriction_index
+        if self.slot:
+            return catalog.frame_postings([(c, frame) for c, frame, _ in index.slots_with(self.feature)])
+        return catalog.class_postings([c for c, _ in index.roles_with(self.feature)])
+
+
+class HasExample(Filter):
+    """Frames with examples that match a query of words, word* prefixes and
+    "quoted phrases", all of them (see ExampleIndex.search)"""
+
+    level = "frames"
+
+    def __init__(self, text):
+        self.text = text
+
+    def count(self, plan):
+        return plan.catalog.vn.example_index.count_query(self.text)
+
+    def find(self, catalog):
+        return catalog.frame_postings([(c, frame) for _, c, frame in catalog.vn.example_index.search(self.text)])
+
+
+class InClass(Filter):
+    """Classes under a class ID, numerical ID or ID prefix (like "51.3"),
+    including the class itself"""
+
+    def __init__(self, ID):
+        self.ID = ID
+
+    def count(self, plan):
+        span = plan.catalog.vn.hierarchy.span(self.ID)
+        return 0 if span is None else span[1] - span[0] + 1
+
+    def find(self, catalog):
+        return catalog.class_postings(catalog.vn.hierarchy.subtree(self.ID))
@@ -53,10 +53,13 @@ def compare_members(from_vn_members, to_vn_members):
     move: member moved from the class to a new vn class
   '''
   all_changes = {}
+  # Hash tables of both member lists, built once for all of the searches below
+  from_vn_table = search.MemberTable(from_vn_members)
+  to_vn_table = search.MemberTable(to_vn_members)
 
   for from_vn_member in from_vn_members:
     # Find that member in to_vn_members, and if there are differences, record them
-    possible_to_vn_members = search.find_members(to_vn_members, name=from_vn_member.name, wn=from_vn_member.wn)
+    possible_to_vn_members = to_vn_table.find(name=from_vn_member.name, wn=from_vn_member.wn)
     changes = []
     to_vn_member = None
     attr_diffs = None
@@ -73,8 +76,7 @@ def compare_members(from_vn_members, to_vn_members):
       # This is to identify an instance of this member in a NEW class
       # to say that this is where it moved to
       for possible_to_vn_member in possible_to_vn_members:
-        if len(search.find_members(from_vn_members, class_ID=possible_to_vn_member.class_id(),
-                                   name=from_vn_member.name)) == 0:
+        if len(from_vn_table.find(class_ID=possible_to_vn_member.class_id(), name=from_vn_member.name)) == 0:
           to_vn_member = possible_to_vn_member
           changes.append(Change(from_vn_member.name, "member", "move", from_vn_member.class_id()))
           # Compare the attributes
@@ -102,7 +104,7 @@ def compare_members(from_vn_members, to_vn_members):
   '''
   for name, class_ID in list(set([(m.name, m.class_id()) for m in to_vn_members]) - set(
       [(m.name, m.class_id()) for m in from_vn_members])):
-    inserted_member = search.find_members(to_vn_members, class_ID=class_ID, name=[name])
+    inserted_member = to_vn_table.find(class_ID=class_ID, name=[name])
     if inserted_member:
       all_changes.setdefault(inserted_member[0].class_id(), []).append(
         Change(inserted_member[0].name, "member", "insert", notes=inserted_member[0].pp()))
@@ -119,13 +121,13 @@ def compare_themroles(from_vn_themroles, to_vn_themroles):
     insert: themrole inserted to the class
   '''
   all_changes = {}
+  to_vn_table = search.ThemroleTable(to_vn_themroles)
 
   for from_themrole in from_vn_themroles:
     changes = []
     diff = None
 
-    possible_to_themrole = search.find_themroles(to_vn_themroles, role_type=from_themrole.role_type,
-                                                 class_ID=from_themrole.class_id())
+    possible_to_themrole = to_vn_table.find(role_type=from_themrole.role_type, class_ID=from_themrole.class_id())
     if possible_to_themrole:  # If themrole is in the same class
       to_themrole = possible_to_themrole[0]
       diff = from_themrole.compare_selres_with(to_themrole)
@@ -141,7 +143,7 @@ def compare_themroles(from_vn_themroles, to_vn_themroles):
   # Find insertions
   for type, class_ID in list(set([(t.role_type, t.class_id()) for t in to_vn_themroles]) - set(
       [(t.role_type, t.class_id()) for t in from_vn_themroles])):
-    inserted_themrole = search.find_themroles(to_vn_themroles, class_ID=class_ID, role_type=type)
+    inserted_themrole = to_vn_table.find(class_ID=class_ID, role_type=type)
     if inserted_themrole:
       all_changes.setdefault(inserted_themrole[0].class_id(), []).append(
         Change(inserted_themrole[0].role_type, "role", "insert", None, inserted_themrole[0].pp()))
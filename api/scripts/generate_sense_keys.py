@@ -44,23 +44,21 @@ def run_script():
     # CHANGE DIRECTORY to desired verbnet version;
     vn_directory = "../../vn3.4.1-test/"
 
-    vnp = VerbNetParser(directory=vn_directory)
-
     count_dict = {}
 
     # Save output to a separate directory instead of writing changes in-place
     if not os.path.exists('sense_key_output'):
         os.mkdir('sense_key_output')
 
-    # parse_files() returns a list of soup objects
-    for v in vnp.parse_files():
-        class_soup = v.VNCLASS
-        members = class_soup.find_all('MEMBER')
-        gen_sense_keys(members, count_dict)
-
-        with open("sense_key_output/" + class_soup['ID'] + '.xml', 'w') as outfile:
+    def write_class(vc, fname):
+        with open("sense_key_output/" + vc.soup['ID'] + '.xml', 'w') as outfile:
             outfile.write(DOCTYPE)
-            outfile.write(class_soup.prettify())
+            outfile.write(vc.soup.prettify())
+
+    # Only one class is parsed at a time, and written back before the next
+    for vc in iter_verb_classes(vn_directory, write_back=write_class):
+        members = vc.soup.find_all('MEMBER')
+        gen_sense_keys(members, count_dict)
 
 
 if __name__ == '__main__':
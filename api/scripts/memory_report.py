@@ -0,0 +1,65 @@
+import sys
+import gc
+import time
+import tracemalloc
+import argparse
+
+local_verbnet_api_path = "../"
+
+sys.path.append(local_verbnet_api_path)
+from verbnet import *
+
+
+def measure(load):
+  '''
+    Run load() and return (result, seconds, MB still allocated afterwards, peak MB)
+  '''
+  gc.collect()
+  tracemalloc.start()
+  start = time.time()
+  result = load()
+  seconds = time.time() - start
+  gc.collect()
+  current, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return result, seconds, current / 2.0 ** 20, peak / 2.0 ** 20
+
+
+def count_objects(vn):
+  counts = {"classes": 0, "members": 0, "themroles": 0, "frames": 0, "predicates": 0, "syntactic roles": 0}
+  for vc in vn.get_verb_classes():
+    counts["classes"] += 1
+    counts["members"] += len(vc.members)
+    counts["themroles"] += len(vc.themroles)
+    counts["frames"] += len(vc.frames)
+    counts["predicates"] += sum([len(f.predicates) for f in vc.frames])
+    counts["syntactic roles"] += sum([len(f.syntax) for f in vc.frames])
+  return counts
+
+
+def memory_report(directory=None, version=None):
+  '''
+    Load the same VerbNet twice, once as the soup model (VerbClass etc. holding
+    their BeautifulSoup trees) and once as the read-only __slots__ records of the
+    lxml backend, and print how much memory each one keeps alive
+  '''
+  soup_vn, soup_time, soup_current, soup_peak = measure(lambda: VerbNetParser(directory=directory, version=version))
+  counts = count_objects(soup_vn)
+  del soup_vn
+  record_vn, record_time, record_current, record_peak = measure(
+    lambda: VerbNetParser(directory=directory, version=version, backend="lxml"))
+
+  print("Objects: %s" % ", ".join(["%d %s" % (n, name) for name, n in counts.items()]))
+  print("%-10s %10s %14s %14s" % ("model", "load (s)", "resident (MB)", "peak (MB)"))
+  print("%-10s %10.2f %14.1f %14.1f" % ("soup", soup_time, soup_current, soup_peak))
+  print("%-10s %10.2f %14.1f %14.1f" % ("records", record_time, record_current, record_peak))
+  print("The records use %.1f%% of the memory of the soup model" % (100 * record_current / soup_current))
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser()
+  parser.add_argument('-d', '--directory', help='Where to find the xml files')
+  parser.add_argument('-v', '--version', help='VerbNet version to look up in config.txt, if no directory is given')
+  args = vars(parser.parse_args())
+
+  memory_report(args.get("directory"), args.get("version"))
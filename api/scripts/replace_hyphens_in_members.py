@@ -18,23 +18,19 @@ if __name__ == '__main__':
   input_dir = args.get("input_dir")
   output_dir = args.get("output_dir")
 
-  vn = VerbNetParser(directory=input_dir)
-  updated_members = []
+  # Only one class is parsed at a time, and saved before the next one if any
+  # of its members (or those of its subclasses) were renamed
+  updated_classes = set()
+  write_class = class_writer(output_dir)
 
-  for m in vn.get_members():
-    if "-" in m.name and m.name not in HYPHEN_VERBS:
-      updated_members.append(m)
-      new_name = m.name.replace("-", "_")
-      m.update_name(new_name)
+  def write_updated_class(vnc, fname):
+    if vnc.ID in updated_classes:
+      print("saving %s" % os.path.join(output_dir, os.path.basename(fname)))
+      write_class(vnc, fname)
 
-  for vnc in vn.get_verb_classes_by_members(updated_members):
-    # We do not want to output a file for a subclass; it will be in the parent class XML
-    if not vnc.is_subclass():
-      # Produce the name of the output file
-      outfile = output_dir + vnc.ID + ".xml"
-      with open(outfile, "w") as f:
-        print("saving %s" % outfile)
-        # Hard code DOCTYPE declaration
-        f.write("<!DOCTYPE VNCLASS SYSTEM \"vn_class-3.dtd\">\n")
-        # Pretty print the class XML
-        f.write(vnc.pp())
\ No newline at end of file
+  for vnc in iter_verb_classes(input_dir, write_back=write_updated_class):
+    for m in [m for c in [vnc] + vnc.get_all_subclasses() for m in c.get_members()]:
+      if "-" in m.name and m.name not in HYPHEN_VERBS:
+        updated_classes.add(vnc.ID)
+        new_name = m.name.replace("-", "_")
+        m.update_name(new_name)
@@ -103,6 +103,11 @@ def update_gl_semantics(matching_semantics, vn, gl_semantics_mappings=[], gold=[
   matches = []
   # track classes have frames that get updated
   updated_classes = []
+  # Compile the semantics to match once, rather than for every frame
+  if matching_semantics and type(matching_semantics[0]) == Predicate:
+    patterns = [PredicatePattern(matching_semantics)]
+  else:
+    patterns = [PredicatePattern(m) for m in matching_semantics]
   # Use get_verb_classes_and_subclasses() so we can check all classes and subclasses in one list
   for vnc in vn.get_verb_classes():
     """
@@ -115,7 +120,7 @@ def update_gl_semantics(matching_semantics, vn, gl_semantics_mappings=[], gold=[
     for frame in vnc.frames_and_subclass_frames():
       # If its one flat list of predicates, just check if frame.contains that list of preds
       if matching_semantics and type(matching_semantics[0]) == Predicate:
-        if frame.contains(matching_semantics):
+        if frame.contains(patterns[0]):
           matches.append((frame.class_id(), frame.examples))
           if update_frame_with_gl(frame, gl_semantics_mappings):
             updated_class = True
@@ -123,7 +128,7 @@ def update_gl_semantics(matching_semantics, vn, gl_semantics_mappings=[], gold=[
       # Otherwise, check if frame.contains any of the multiple matches
       # (Or this could just be a single frame, which should work the same)
       else:
-        if any([frame.contains(m) for m in matching_semantics]):
+        if any([frame.contains(pattern) for pattern in patterns]):
           matches.append((frame.class_id(), frame.examples))
           if update_frame_with_gl(frame, gl_semantics_mappings):
             updated_class = True
@@ -6,21 +6,26 @@ Module with search functions for Verbnet classes.
 from verbnet import *
 
 def search_by_predicate(verbclasslist, pred_type):
-    """Returns verbclasses that exactly match the predicate."""
+    """Returns verbclasses that exactly match the predicate. verbclasslist can
+    also be a VerbNetParser, whose predicate index has the answer."""
+    if isinstance(verbclasslist, VerbNetParser):
+        return list(verbclasslist.predicate_index.classes(pred_type))
     successes = []
     for vc in verbclasslist:
         for frame in vc.frames:
-            for pred in frame.vnframe.predicates:
-                if pred.value[0] == pred_type:
-                    if vc not in successes:
-                        successes.append(vc)
+            if [pred for pred in frame.vnframe.predicates if pred.value[0] == pred_type]:
+                successes.append(vc)
+                break
     return successes
 
 
 def search_by_argtype(verbclasslist, argtype, contains=False):
     """Returns verbclass IDs that have predicates that contain the argtype.
     Optional variable to allow for searching to see if the argtype contains a
-    string."""
+    string. verbclasslist can also be a VerbNetParser, whose argument index is
+    used instead of going through all the predicates."""
+    if isinstance(verbclasslist, VerbNetParser):
+        return [vc.ID for vc in verbclasslist.argument_index.find_classes(argtype, contains=contains)]
     results = []
     for vc in verbclasslist:
         for frame in vc.frames:
@@ -76,41 +81,53 @@ def search_by_subclass_ID(subclass, ID):
 def search_by_themroles(verbclasslist, themroles, only=False):
     """Returns verbclasses that contain specified thematic roles.
     Only returns classes that contain every role in the list, with the option
-    to only return classes that contain all and only those roles."""
+    to only return classes that contain all and only those roles. The roles a
+    subclass inherits count as its own, if its top level class is in the list
+    too. verbclasslist can also be a VerbNetParser, whose themrole index
+    answers this the same way."""
+    if isinstance(verbclasslist, VerbNetParser):
+        if only:
+            return verbclasslist.themrole_index.exactly(themroles)
+        return verbclasslist.themrole_index.contains_all(themroles)
     results = []
-    nocase_themroles = [themrole.lower() for themrole in themroles]
+    nocase_themroles = set([themrole.lower() for themrole in themroles])
+    verbclasslist = list(verbclasslist)
+    # A subclass inherits the roles of the classes above it, which are found
+    # through its top level class when that is in the list as well
+    top_classes = dict([(vc.ID, vc) for vc in verbclasslist if not hasattr(vc, "roles") and not vc.is_subclass()])
     for vc in verbclasslist:
-        out = False
-        for themrole in vc.roles:
-            if themrole.role_type.lower() not in nocase_themroles:
-                out = True
-        if not out:
-            if only:
-                if len(themroles) == len(vc.roles):
-                    results.append(vc)
-            else:
+        # GLVerbClasses have their roles (including inherited ones) in roles
+        if hasattr(vc, "roles"):
+            roles = vc.roles
+        elif vc.class_id(False) in top_classes:
+            roles = inherited_themroles(top_classes[vc.class_id(False)], vc)
+        else:
+            roles = vc.themroles
+        nocase_roles = set([themrole.role_type.lower() for themrole in roles])
+        if nocase_themroles <= nocase_roles:
+            if not only or nocase_themroles == nocase_roles:
                 results.append(vc)
     return results
 
 
 def search_by_POS(verbclasslist, POS_list, only=False):
-    """Returns frames (and their verbclass's ID) that contain specified syntactic roles.
-    Only returns frames that contain every role in the list, with the option
-    to only return frames that contain all and only those roles.
-
-    TODO: consider ordering and differentiating between classes with 1 NP vs 2,
-    etc."""
+    """Returns frames (and their verbclass's ID) whose syntactic roles are all
+    in the list, with the option to only return frames that also have as many
+    roles as the list. verbclasslist can also be a VerbNetParser, whose pattern
+    index answers the same question (see FramePatternIndex.within)."""
+    if isinstance(verbclasslist, VerbNetParser):
+        return [(frame, vc.ID) for vc, frame in verbclasslist.pattern_index.within(POS_list, only=only)]
     results = []
     nocase_pos = [POS.lower() for POS in POS_list]
     for vc in verbclasslist:
         for frame in vc.frames:
             out = False
-            for member in frame.subcat:
-                if member.cat.lower() not in nocase_pos:
+            for role in frame.syntax:
+                if role.POS.lower() not in nocase_pos:
                     out = True
             if not out:
                 if only:
-                    if len(POS_list) == len(frame.subcat):
+                    if len(POS_list) == len(frame.syntax):
                         results.append((frame, vc.ID))
                 else:
                     results.append((frame, vc.ID))
@@ -272,101 +289,167 @@ def find_members(members=None, class_ID=None, name=None, wn=None, grouping=None,
     ***Note, if you have already instantiated a verbnetparser object, it
     is more efficient to pass the members in via .get_members()
     so as to not parse all the files a second time here.***
+    members can also be a VerbNetParser, whose member, sense, roleset and
+    feature indexes are used to find the members with a given name, wn,
+    grouping or features, instead of going through all of them.
+    To run many searches over the same members, use find_members_many, or
+    keep a MemberTable.
     """
-    members = members if members else get_verbnet_parser().get_members()
-    member_lists = [[], [], [], [], []]
-    for member in members:
-        if class_ID:
-            # Check both, in case only the numerical version is provided
-            if member.class_id() == class_ID or member.numerical_class_id() == class_ID:
-                member_lists[0].append(member)
+    if isinstance(members, VerbNetParser) or not members:
+        vn = members if members else get_verbnet_parser()
         if name:
-            # member.name used to return a list, so some scripts may pass
-            # a list to this search, but we want a string
-            if type(name) == list:
-                name = name[0]
-            if member.name == name:
-                member_lists[1].append(member)
-        if wn:
-            if member.wn == wn:
-                member_lists[2].append(member)
-        if grouping:
-            if member.grouping == grouping:
-                member_lists[3].append(member)
-        if features:
-            if member.features == features:
-                member_lists[4].append(member)
+            members = [m for _, _, m in vn.lookup_members([name[0] if type(name) == list else name])
+                       .popitem()[1]]
+        elif wn:
+            members = [m for _, _, m in vn.sense_index.lookup(wn[0])]
+        elif grouping:
+            members = [m for _, _, m in vn.roleset_index.lookup(grouping[0])]
+        elif features:
+            members = [m for _, _, m in vn.lookup_features(features, match="exactly")]
+        else:
+            members = vn.get_members()
+    return MemberTable(members).find(class_ID, name, wn, grouping, features)
 
-    """
-    If a parameter was defined and there are no matches,
-    make sure to return an empty list
-    """
-    if class_ID and len(member_lists[0]) == 0:
-        return []
-    if name and len(member_lists[1]) == 0:
-        return []
-    if wn and len(member_lists[2]) == 0:
-        return []
-    if grouping and len(member_lists[3]) == 0:
-        return []
-    if features and len(member_lists[4]) == 0:
-        return []
-
-    # Remove empty lists
-    member_lists = [ml for ml in member_lists if ml]
-    # Get a dict of all of the members we found, keyed by a unique ID for lookup later
-    members_dict = {(m.name, m.class_id()): m for ml in member_lists for m in ml}
-
-    # return the intersection of each populated list, to ensure
-    # that the members return fuflill each provided parameter
-    if member_lists:
-        # Get sets of tuples with unique id's
-        member_sets = [set([(m.name, m.class_id())for m in ml]) for ml in member_lists]
-        # Find the intersections, as those will be the members that mett all of the
-        # search criteria
-        intersections = list(set.intersection(*member_sets))
-        #print(intersections)
-        return list(members_dict[m] for m in intersections)
-    else:
-        return []
 
-def find_themroles(themroles=[], class_ID=None, role_type=None, sel_restrictions=None):
-    themroles = themroles if themroles else get_verbnet_parser().get_themroles()
-    themrole_lists = [[], [], []]
-    for themrole in themroles:
-        if class_ID:
-            if themrole.class_id() == class_ID:
-                themrole_lists[0].append(themrole)
-        if role_type:
-            if themrole.role_type == role_type:
-                themrole_lists[1].append(themrole)
-        if sel_restrictions:
-            if themrole.sel_restrictions == sel_restrictions:
-                themrole_lists[2].append(themrole)
+def find_members_many(members, queries):
+    """Run find_members for a list of queries, dicts of its keyword arguments
+    (like {"name": "give", "class_ID": "give-13.1"}), over the same list of
+    members, which are only gone through once. Like for find_members, members
+    can also be a VerbNetParser, or nothing for the default one"""
+    if isinstance(members, VerbNetParser) or not members:
+        members = (members if members else get_verbnet_parser()).get_members()
+    table = MemberTable(members)
+    return [table.find(**query) for query in queries]
+
 
+def find_themroles(themroles=[], class_ID=None, role_type=None, sel_restrictions=None):
     """
-    If a parameter was defined and there are no matches,
-    make sure to return an empty list
+    Like find_members, but for themroles. themroles can be a VerbNetParser,
+    in which case only the roles of the class, or of the role type, are checked
     """
-    if class_ID and len(themrole_lists[0]) == 0:
-        return []
-    if role_type and len(themrole_lists[1]) == 0:
-        return []
-    if sel_restrictions and len(themrole_lists[2]) == 0:
-        return []
-
-    # Remove empty lists
-    themrole_lists = [t for t in themrole_lists if t]
-
-    if themrole_lists:
-        themrole_sets = [set(x) for x in themrole_lists]
-        return list(set.intersection(*themrole_sets))
-    else:
-        return []
+    if isinstance(themroles, VerbNetParser) or not themroles:
+        vn = themroles if themroles else get_verbnet_parser()
+        if class_ID and class_ID in vn.verb_classes_dict:
+            themroles = vn.verb_classes_dict[class_ID].themroles
+        elif role_type:
+            themroles = [t for t in vn.themrole_index.themroles(role_type) if t.role_type == role_type]
+        else:
+            themroles = vn.get_themroles()
+    return ThemroleTable(themroles).find(class_ID, role_type, sel_restrictions)
+
+
+def find_themroles_many(themroles, queries):
+    """find_themroles for a list of queries (dicts of its keyword arguments)
+    over the same list of themroles, which can also be a VerbNetParser or
+    nothing, like for find_themroles"""
+    if isinstance(themroles, VerbNetParser) or not themroles:
+        themroles = (themroles if themroles else get_verbnet_parser()).get_themroles()
+    table = ThemroleTable(themroles)
+    return [table.find(**query) for query in queries]
+
+
+class SearchTable(object):
+    """Hash tables from the values of some attributes to the positions of the
+    elements that have them, built in one pass over a list of elements. The
+    elements are numbered by their place in the list, and a search looks up
+    the posting list of every value it was given, and joins them on those
+    numbers, starting from the shortest list. Values that are lists are
+    compared as lists, like the == of the plain searches did"""
+
+    def __init__(self, elements):
+        self.elements = list(elements)
+        self.tables = {}
+
+    def add(self, attribute, value, position):
+        postings = self.tables.setdefault(attribute, {}).setdefault(freeze(value), [])
+        if not postings or postings[-1] != position:
+            postings.append(position)
+
+    def join(self, criteria):
+        """The positions that are in the postings of all (attribute, value)
+        criteria, in order, or [] without criteria"""
+        postings = sorted([self.tables.get(attribute, {}).get(freeze(value), []) for attribute, value in criteria],
+                          key=len)
+        if not postings or not postings[0]:
+            return []
+        positions = postings[0]
+        for other in postings[1:]:
+            other = set(other)
+            positions = [i for i in positions if i in other]
+        return positions
+
+
+def freeze(value):
+    """Hashable version of a value, lists (of lists) become tuples, tagged so
+    that they only match lists. Records store their lists as tuples, so those
+    count as lists too"""
+    if isinstance(value, (list, tuple)):
+        return ("list", tuple([freeze(v) for v in value]))
+    return value
+
+
+class MemberTable(SearchTable):
+    """SearchTable of a list of members, by their class ID (both the full and
+    the numerical one), name, wn, grouping and features. Members are
+    identified by the number of their (name, class ID) pair, so that a search
+    returns one member for each"""
+
+    def __init__(self, members):
+        SearchTable.__init__(self, members)
+        numbers = {}
+        self.keys = []
+        for i, member in enumerate(self.elements):
+            class_ID = member.class_id()
+            self.keys.append(numbers.setdefault((member.name, class_ID), len(numbers)))
+            self.add("class_ID", class_ID, i)
+            self.add("class_ID", "-".join(class_ID.split("-")[1:]), i)
+            self.add("name", member.name, i)
+            self.add("wn", member.wn, i)
+            self.add("grouping", member.grouping, i)
+            self.add("features", member.features, i)
+
+    def find(self, class_ID=None, name=None, wn=None, grouping=None, features=None):
+        # member.name used to return a list, so some scripts may pass
+        # a list to this search, but we want a string
+        if type(name) == list:
+            name = name[0]
+        criteria = [(attribute, value) for attribute, value in [("class_ID", class_ID), ("name", name), ("wn", wn),
+                                                                 ("grouping", grouping), ("features", features)]
+                    if value]
+        # One member per (name, class ID), the last one found
+        found = {}
+        for i in self.join(criteria):
+            found[self.keys[i]] = self.elements[i]
+        return list(found.values())
+
+
+class ThemroleTable(SearchTable):
+    """SearchTable of a list of themroles, by class ID, role type and
+    selectional restrictions"""
+
+    def __init__(self, themroles):
+        SearchTable.__init__(self, themroles)
+        for i, themrole in enumerate(self.elements):
+            self.add("class_ID", themrole.class_id(), i)
+            self.add("role_type", themrole.role_type, i)
+            self.add("sel_restrictions", themrole.sel_restrictions, i)
+
+    def find(self, class_ID=None, role_type=None, sel_restrictions=None):
+        criteria = [(attribute, value) for attribute, value in [("class_ID", class_ID), ("role_type", role_type),
+                                                                 ("sel_restrictions", sel_restrictions)]
+                    if value]
+        # Each role once, even if it was in the list more than once
+        found = {}
+        for i in self.join(criteria):
+            found.setdefault(id(self.elements[i]), self.elements[i])
+        return list(found.values())
+
 
 def find_frames(frames):
     return True
 
-def get_verbnet_parser(version="3.4"):
-    return VerbNetParser(version=version)
+def get_verbnet_parser(version="3.4", backend="bs4", cache=None):
+    """Use backend="lxml" (or a snapshot cache) for searches that do not edit
+    the classes, they load read-only records without building any soup"""
+    return VerbNetParser(version=version, backend=backend, cache=cache)
 
@@ -0,0 +1,322 @@
+import os
+import shutil
+import sys
+import time
+
+import pytest
+
+local_verbnet_api_path = "../"
+
+sys.path.append(local_verbnet_api_path)
+from verbnet import *
+
+VERBNET_34 = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../verbnet3.4")
+
+
+def old_check_vn(vn, vn_class, verb, update=False):
+    """check_vn as it was before it went through the member index and the
+    class hierarchy"""
+    if not vn_class:
+        return False
+    if vn_class in vn.verb_classes_numerical_dict:
+        if verb in [m.name for m in vn.verb_classes_numerical_dict[vn_class].members]:
+            return vn_class
+    if update:
+        if vn_class not in vn.verb_classes_numerical_dict:
+            if vn_class.split("-")[0] in vn.verb_classes_numerical_dict:
+                vn_class = vn_class.split("-")[0]
+            else:
+                return False
+        top = vn.verb_classes_numerical_dict[vn_class.split("-")[0]]
+        for subclass in [top] + top.get_all_subclasses():
+            if verb in [m.name for m in subclass.get_members()]:
+                return subclass.numerical_ID
+    return False
+
+
+def copy_classes(tmp_path, names):
+    directory = str(tmp_path / "vn")
+    os.mkdir(directory)
+    for name in names:
+        shutil.copy(os.path.join(VERBNET_34, name + ".xml"), directory)
+    return directory
+
+
+def test_check_vn():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    pairs = []
+    for vc in vn.get_verb_classes():
+        for m in vc.members:
+            pairs.append((vc.numerical_ID, m.name))
+            if not vc.is_subclass():
+                # Where the old check_vn fell back on the top level class, the
+                # closest class is the first one with the verb under it
+                pairs.append((vc.numerical_ID + "-9", m.name))
+                pairs.append((vc.numerical_ID, vc.get_all_subclasses()[0].members[0].name
+                              if vc.get_all_subclasses() and vc.get_all_subclasses()[0].members else m.name))
+    pairs += [("13.1", "run"), ("999.9", "give"), ("", "give")]
+    for vn_class, verb in pairs:
+        for update in (False, True):
+            assert vn.check_vn(vn_class, verb, update=update) == old_check_vn(vn, vn_class, verb, update)
+    assert vn.check_vn_many(pairs, update=True) == [old_check_vn(vn, c, v, True) for c, v in pairs]
+
+    # Below the longest prefix first, then further up
+    assert vn.check_vn("13.1-1-9", "give", update=True) == "13.1-1"
+    assert vn.check_vn("13.1-1-9", "lend", update=True) == "13.1"
+
+
+def test_check_vn_lazy():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    lazy = VerbNetParser(directory=VERBNET_34, backend="lxml", lazy=True)
+    assert lazy.check_vn("13.1-1-9", "lend", update=True) == vn.check_vn("13.1-1-9", "lend", update=True)
+    assert len(lazy._loaded_files) == 1
+
+
+def test_refresh(tmp_path):
+    directory = copy_classes(tmp_path, ["give-13.1", "run-51.3.2", "send-11.1"])
+    for lazy in (False, True):
+        vn = VerbNetParser(directory=directory, backend="lxml", lazy=lazy)
+        vn.verb_classes_dict["give-13.1"]
+        # Only touched, the content is the same
+        later = time.time() + 10
+        for fname in os.listdir(directory):
+            os.utime(os.path.join(directory, fname), (later, later))
+        assert vn.refresh() == ([], [], [])
+
+        fname = os.path.join(directory, "give-13.1.xml")
+        with open(fname) as f:
+            xml = f.read()
+        with open(fname, "w") as f:
+            f.write(xml.replace('name="lend"', 'name="loan_out"'))
+        assert vn.refresh() == ([], [], [fname])
+        assert vn.check_vn("13.1", "loan_out")
+        assert not vn.check_vn("13.1", "lend")
+        if not lazy:
+            # The classes of give-13.1 are back in front, like after a fresh load
+            fresh = VerbNetParser(directory=directory, backend="lxml")
+            assert list(vn.verb_classes_dict) == list(fresh.verb_classes_dict)
+            assert list(vn.verb_classes_numerical_dict) == list(fresh.verb_classes_numerical_dict)
+            assert [(name, [c.ID for _, c, _ in entries]) for name, entries in vn.member_index.items()] == \
+                [(name, [c.ID for _, c, _ in entries]) for name, entries in fresh.member_index.items()]
+            assert [[c.ID for c, _ in vn.predicate_index.frames(key)] for key in vn.predicate_index.keys()] == \
+                [[c.ID for c, _ in fresh.predicate_index.frames(key)] for key in fresh.predicate_index.keys()]
+        with open(fname, "w") as f:
+            f.write(xml)
+
+
+def test_snapshot_cache(tmp_path):
+    directory = copy_classes(tmp_path, ["give-13.1", "run-51.3.2"])
+    path = str(tmp_path / "snapshot.pickle")
+    parsed = VerbNetParser(directory=directory, backend="lxml")
+    first = VerbNetParser(directory=directory, cache=path)
+    assert os.path.exists(path)
+    cached = VerbNetParser(directory=directory, cache=path)
+    for vn in (first, cached):
+        assert sorted(vn.verb_classes_dict) == sorted(parsed.verb_classes_dict)
+        assert [m.name for m in vn.get_members()] == [m.name for m in parsed.get_members()]
+        assert [[p.value for p in f.predicates] for f in vn.get_frames()] == \
+            [[p.value for p in f.predicates] for f in parsed.get_frames()]
+
+    # A changed file is parsed again, the other one comes from the snapshot
+    fname = os.path.join(directory, "run-51.3.2.xml")
+    with open(fname) as f:
+        xml = f.read()
+    with open(fname, "w") as f:
+        f.write(xml.replace('name="run"', 'name="sprint_off"'))
+    vn = VerbNetParser(directory=directory, cache=path)
+    assert vn.check_vn("51.3.2-2-1", "sprint_off")
+    assert vn.lookup_members("give")["give"]
+
+    with pytest.raises(ValueError):
+        VerbNetParser(directory=directory, cache=path, lazy=True)
+
+
+def test_snapshot_cache_selection(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    directory = copy_classes(tmp_path, ["give-13.1", "run-51.3.2"])
+    link = str(tmp_path / "link")
+    os.symlink(directory, link)
+    give = VerbNetParser(directory=directory, class_glob="give-*", cache=True)
+    everything = VerbNetParser(directory=directory, cache=True)
+    assert give.cache.path != everything.cache.path
+    assert sorted(give.verb_classes_dict) == ["give-13.1", "give-13.1-1"]
+
+    # Each one finds its own snapshot whole, also through another path
+    for vn in (VerbNetParser(directory=link, class_glob="give-*", cache=True),
+               VerbNetParser(directory=directory, cache=True)):
+        assert vn.cache.changed == []
+    assert len(os.listdir(str(tmp_path / "cache" / "verbnet"))) == 2
+
+
+def test_update_name():
+    vn = VerbNetParser(directory=VERBNET_34, class_glob="confront-*")
+    vc = vn.verb_classes_numerical_dict["98"]
+    member = vc.members[0]
+    old_name = member.name
+    member.update_name("zzznewname")
+    assert vn.check_vn("98", "zzznewname")
+    assert not vn.check_vn("98", old_name)
+    assert [c.ID for c in vn.get_verb_classes_by_members(["zzznewname"])] == ["confront-98"]
+    assert vn.lookup_members(old_name)[old_name] == []
+    assert "zzznewname" in vc.names and old_name not in vc.names
+    vc.remove_member("zzznewname")
+    assert not vn.check_vn("98", "zzznewname")
+
+
+def test_records_are_not_edited_by_comparisons():
+    soups = VerbNetParser(directory=VERBNET_34, class_glob="a*")
+    records = VerbNetParser(directory=VERBNET_34, class_glob="a*", backend="lxml")
+    vc = records.get_verb_classes()[0]
+    assert type(vc.members) == tuple and type(vc.frames[0].syntax) == tuple
+
+    soup_roles = [t for vc in soups.get_verb_classes() for sub in [vc] + vc.get_all_subclasses() for t in sub.themroles]
+    roles = [t for vc in records.get_verb_classes() for sub in [vc] + vc.get_all_subclasses() for t in sub.themroles]
+    trees = [repr(t.sel_restrictions) for t in soup_roles]
+    for i in range(len(roles)):
+        for j in range(len(roles)):
+            assert roles[i].compare_selres_with(roles[j]) == soup_roles[i].compare_selres_with(soup_roles[j])
+    # Comparing used to pop the restrictions both roles have in common
+    assert [repr(t.sel_restrictions) for t in soup_roles] == trees
+    assert [repr(thawed(t.sel_restrictions)) for t in roles] == trees
+
+
+def test_iter_verb_classes_writes_back_on_break(tmp_path):
+    directory = copy_classes(tmp_path, ["give-13.1", "run-51.3.2"])
+    output_dir = str(tmp_path / "out")
+    os.mkdir(output_dir)
+    for vc in iter_verb_classes(directory, write_back=class_writer(output_dir)):
+        vc.members[0].update_name("zzznewname")
+        break
+    assert os.listdir(output_dir) == ["give-13.1.xml"]
+    vn = VerbNetParser(directory=output_dir)
+    assert vn.check_vn("13.1", "zzznewname")
+
+
+def test_hierarchy():
+    vn = VerbNetParser(directory=VERBNET_34, class_glob=["run-*", "give-*", "break-*", "hit-*", "seem-*"])
+    for vc in vn.get_verb_classes():
+        elements = vc.members + vc.themroles + vc.frames + [p for f in vc.frames for p in f.predicates] + \
+            [r for f in vc.frames for r in f.syntax]
+        stored = [(e.class_id(), e.class_id(False), e.numerical_class_id()) for e in elements]
+        # Without the IDs VerbClass stored, class_id() climbs the soup
+        for e in elements:
+            e.top_class_ID = None
+        assert [(e.class_id(), e.class_id(False), e.numerical_class_id()) for e in elements] == stored
+
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    classes = vn.get_verb_classes()
+    for prefix in ["51", "51.3", "13.1", "13.1-1", "109", "45.4-1", "999"]:
+        under = [vc.ID for vc in classes if vc.numerical_ID == prefix or vc.numerical_ID.startswith(prefix + ".")
+                 or vc.numerical_ID.startswith(prefix + "-")]
+        assert sorted([vc.ID for vc in vn.hierarchy.subtree(prefix)]) == sorted(under)
+        for vc in classes[::50]:
+            assert vn.hierarchy.is_under(vc.numerical_ID, prefix) == (vc.ID in under)
+    # The path up the nesting of the subclasses, which is not always what the
+    # IDs say (separate-23.1-1-1 is right under separate-23.1)
+    parents = dict([(sub.ID, vc) for vc in classes for sub in vc.subclasses])
+    for vc in classes:
+        path = [vc]
+        while path[-1].ID in parents:
+            path.append(parents[path[-1].ID])
+        assert [c.ID for c in vn.hierarchy.class_path(vc)] == [c.ID for c in path]
+
+
+def record_state(value):
+    """Everything a record holds, down through the records in it, as plain values"""
+    if isinstance(value, AbstractRecord):
+        return (type(value).__name__,) + tuple([record_state(getattr(value, name)) for name in value._fields()
+                                                 if name != "filename"])
+    if isinstance(value, (list, tuple)):
+        return tuple([record_state(v) for v in value])
+    if isinstance(value, dict):
+        return tuple(sorted([(k, record_state(v)) for k, v in value.items()]))
+    return value
+
+
+def test_lxml_backend():
+    globs = ["give-*", "run-*", "separate-*", "hit-*", "admire-*", "lodge-*"]
+    soups = VerbNetParser(directory=VERBNET_34, class_glob=globs)
+    records = VerbNetParser(directory=VERBNET_34, class_glob=globs, backend="lxml")
+    assert [record_state(VerbClassRecord.from_verb_class(vc)) for vc in soups.get_verb_classes()
+            if not vc.is_subclass()] == \
+        [record_state(vc) for vc in records.get_verb_classes() if not vc.is_subclass()]
+
+
+def test_workers():
+    globs = ["give-*", "run-*", "send-*", "break-*"]
+    parsed = VerbNetParser(directory=VERBNET_34, class_glob=globs, backend="lxml")
+    for backend in ("bs4", "lxml"):
+        vn = VerbNetParser(directory=VERBNET_34, class_glob=globs, workers=2, backend=backend)
+        assert [record_state(vc) for vc in vn.get_verb_classes()] == \
+            [record_state(vc) for vc in parsed.get_verb_classes()]
+
+
+def test_class_selectors(tmp_path):
+    everything = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    top = [vc for vc in everything.get_verb_classes() if not vc.is_subclass()]
+
+    def IDs(vn):
+        return [vc.ID for vc in vn.get_verb_classes() if not vc.is_subclass()]
+
+    def in_class(vc, prefix):
+        return vc.numerical_ID == prefix or vc.numerical_ID.startswith(prefix + ".") \
+            or vc.numerical_ID.startswith(prefix + "-")
+
+    selected = VerbNetParser(directory=VERBNET_34, backend="lxml", class_glob="run-*")
+    assert IDs(selected) == [vc.ID for vc in top if vc.ID.startswith("run-")]
+    selected = VerbNetParser(directory=VERBNET_34, backend="lxml", class_regex=["^give", r"-13\.5\."])
+    assert IDs(selected) == [vc.ID for vc in top if vc.ID.startswith("give") or "-13.5." in vc.ID]
+    selected = VerbNetParser(directory=VERBNET_34, backend="lxml", class_prefix=["51", "13.5.*"])
+    assert IDs(selected) == [vc.ID for vc in top if in_class(vc, "51") or in_class(vc, "13.5")]
+    selected = VerbNetParser(directory=VERBNET_34, backend="lxml", class_prefix="10", max_count=3)
+    assert IDs(selected) == [vc.ID for vc in top if in_class(vc, "10")][:3]
+    # file_list keeps its own order, and names that are not there are skipped
+    file_list = tmp_path / "classes.txt"
+    file_list.write_text("run-51.3.2\ngive-13.1\nno-such-class-1\n")
+    selected = VerbNetParser(directory=VERBNET_34, backend="lxml", file_list=str(file_list))
+    assert IDs(selected) == ["run-51.3.2", "give-13.1"]
+
+
+def test_corpus_registry(tmp_path):
+    from corpus import CorpusRegistry
+    globs = ["give-*", "run-*", "hit-*", "admire-*"]
+    registry = CorpusRegistry(config_path=str(tmp_path / "config.txt"))
+    registry.register("3.4", VERBNET_34)
+    registry.register("test", os.path.join(os.path.dirname(VERBNET_34), "verbnet-test"))
+    vn34 = registry.get("3.4", class_glob=globs)
+    test = registry.get("test", class_glob=globs)
+    assert registry.get("3.4") is vn34
+    # Sharing the records does not change what they hold
+    for vn in (vn34, test):
+        parsed = VerbNetParser(directory=vn.directory, version=vn.version, class_glob=globs, backend="lxml")
+        assert [record_state(vc) for vc in vn.get_verb_classes()] == \
+            [record_state(vc) for vc in parsed.get_verb_classes()]
+    # and what is the same in both versions is the same record
+    for vc in test.get_verb_classes():
+        other = vn34.verb_classes_dict.get(vc.ID)
+        if other is not None:
+            for part in ("members", "themroles", "frames"):
+                shared = [id(r) for r in getattr(other, part)]
+                assert [r for r in getattr(vc, part) if record_state(r) in
+                        [record_state(o) for o in getattr(other, part)] and id(r) not in shared] == []
+
+
+def test_lazy():
+    globs = ["give-*", "run-*", "separate-*", "hit-*", "lodge-*", "act-*", "play-*"]
+    vn = VerbNetParser(directory=VERBNET_34, class_glob=globs, backend="lxml")
+    lazy = VerbNetParser(directory=VERBNET_34, class_glob=globs, backend="lxml", lazy=True)
+    assert not lazy._loaded_files
+    # One class loads its file only
+    assert record_state(lazy.verb_classes_dict["give-13.1-1"]) == record_state(vn.verb_classes_dict["give-13.1-1"])
+    assert len(lazy._loaded_files) == 1
+    assert record_state(lazy.verb_classes_numerical_dict["114.2"]) == \
+        record_state(vn.verb_classes_numerical_dict["114.2"])
+    # Going through everything gives what parsing everything up front gives, in the same order
+    assert list(lazy.verb_classes_dict) == list(vn.verb_classes_dict)
+    assert list(lazy.verb_classes_numerical_dict) == list(vn.verb_classes_numerical_dict)
+    assert [record_state(vc) for vc in lazy.get_verb_classes()] == [record_state(vc) for vc in vn.get_verb_classes()]
+    lazy = VerbNetParser(directory=VERBNET_34, class_glob=globs, backend="lxml", lazy=True)
+    lazy.verb_classes_dict["run-51.3.2"]
+    names = ["give", "run", "hit", "lodge", "play"]
+    assert [vc.ID for vc in lazy.get_verb_classes_by_members(names)] == \
+        [vc.ID for vc in vn.get_verb_classes_by_members(names)]
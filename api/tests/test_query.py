@@ -0,0 +1,81 @@
+import os
+import sys
+
+local_verbnet_api_path = "../"
+
+sys.path.append(local_verbnet_api_path)
+from verbnet import *
+from query import *
+
+VERBNET_34 = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../verbnet3.4")
+
+
+def has_segment(sequence, segment):
+    """Whether sequence has the tokens of segment in a row, "PP" also standing
+    for "PP.location" and the like"""
+    tokens = [token.split(".")[0] for token in sequence]
+    return [i for i in range(len(tokens)) if tokens[i:i + len(segment)] == segment] != []
+
+
+def scan(vn, query, level):
+    """The IDs of the classes, or the (class ID, frame id) of the frames, that
+    match query, found by going through all of them and combining the filters
+    with set operations"""
+    classes = vn.get_verb_classes()
+    frames = [(c, frame) for c in classes for frame in c.frames]
+    if isinstance(query, And):
+        return set.intersection(*[scan(vn, q, level) for q in query.queries])
+    if isinstance(query, Or):
+        return set.union(*[scan(vn, q, level) for q in query.queries])
+    if isinstance(query, Not):
+        everything = set([c.ID for c in classes]) if level == "classes" else set([(c.ID, id(f)) for c, f in frames])
+        return everything - scan(vn, query.query, level)
+
+    def roles(c):
+        return set([role.role_type for role in inherited_themroles(vn.verb_classes_dict[c.class_id(False)], c)])
+
+    class_tests = {
+        HasMember: lambda c: query.name in [m.name for m in c.members],
+        HasRole: lambda c: set(query.roles) <= roles(c),
+        HasRestriction: lambda c: [role for role in c.themroles
+                                   if query.feature in restriction_features(role.sel_restrictions)],
+        InClass: lambda c: c.numerical_ID == query.ID or c.numerical_ID.startswith(query.ID + ".")
+        or c.numerical_ID.startswith(query.ID + "-"),
+    }
+    frame_tests = {
+        HasPredicate: lambda f: query.value in [p.value[0] for p in f.predicates if p.value],
+        HasArgument: lambda f: [v for p in f.predicates for _, v in p.argtypes
+                                if (query.value in v if query.contains else query.value == v)],
+        HasSyntax: lambda f: has_segment(f.primary, query.pattern.split()),
+    }
+    if type(query) in class_tests:
+        found = [c for c in classes if class_tests[type(query)](c)]
+        if level == "classes":
+            return set([c.ID for c in found])
+        return set([(c.ID, id(f)) for c in found for f in c.frames])
+    found = [(c, f) for c, f in frames if frame_tests[type(query)](f)]
+    if level == "classes":
+        return set([c.ID for c, _ in found])
+    return set([(c.ID, id(f)) for c, f in found])
+
+
+def test_queries():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    queries = [
+        HasPredicate("motion") & HasRole(["Agent", "Theme"]) & ~HasMember(name="run"),
+        (HasSyntax("NP V NP") | HasArgument("ch_of", contains=True)) & InClass("13"),
+        HasRestriction("+animate") & ~HasPredicate("cause"),
+        HasMember(name="give") | InClass("51.3") & HasPredicate("path_rel"),
+        ~(HasPredicate("motion") | HasPredicate("path_rel")) & HasArgument("Agent"),
+        HasPredicate("motion") & HasPredicate("zzz"),
+    ]
+    for query in queries:
+        classes = query.classes(vn)
+        frames = query.frames(vn)
+        assert set([c.ID for c in classes]) == scan(vn, query, "classes")
+        assert set([(c.ID, id(f)) for c, f in frames]) == scan(vn, query, "frames")
+        # In the order of the catalog, once each
+        catalog = get_catalog(vn)
+        class_ids = [catalog.class_ids[id(c)] for c in classes]
+        frame_ids = [catalog.frame_ids[id(f)] for _, f in frames]
+        assert class_ids == sorted(set(class_ids)) and frame_ids == sorted(set(frame_ids))
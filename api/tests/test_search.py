@@ -0,0 +1,345 @@
+import os
+import sys
+
+local_verbnet_api_path = "../"
+
+sys.path.append(local_verbnet_api_path)
+from verbnet import *
+import search
+import verbnet
+
+VERBNET_34 = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../verbnet3.4")
+
+
+def frame_ids(results):
+    return [(id(frame), ID) for frame, ID in results]
+
+
+def test_search_by_POS():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    classes = vn.get_verb_classes()
+    for POS_list, only in [(["NP", "VERB"], False), (["NP", "VERB", "NP"], True),
+                           (["np", "verb", "prep", "np"], False), ([], False)]:
+        assert frame_ids(search.search_by_POS(vn, POS_list, only)) == \
+            frame_ids(search.search_by_POS(classes, POS_list, only))
+
+
+def test_example_queries_without_words():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    assert vn.example_index.phrase("") == []
+    assert vn.example_index.phrase("?!") == []
+    assert vn.search_examples("...") == []
+    assert vn.example_index.count_query("...") == 0
+    assert [frame for _, _, frame in vn.search_examples('"" gave')] == \
+        [frame for _, _, frame in vn.search_examples("gave")]
+
+
+def test_search_by_argtype_after_arg_edits():
+    vn = VerbNetParser(directory=VERBNET_34, class_glob=["give-*", "run-*"])
+    assert search.search_by_argtype(vn, "zzz_state") == []
+    vc = vn.verb_classes_dict["give-13.1"]
+    predicate = vc.frames[0].predicates[0]
+    arg = bs4.BeautifulSoup('<ARG type="Constant" value="zzz_state"/>', "lxml-xml").ARG
+    predicate.add_args([arg])
+    assert search.search_by_argtype(vn, "zzz_state") == ["give-13.1"]
+    assert search.search_by_argtype(vn, "zzz_", contains=True) == ["give-13.1"]
+    predicate.remove_args([arg])
+    assert search.search_by_argtype(vn, "zzz_state") == []
+
+
+def scan_members(members, class_ID=None, name=None, wn=None, grouping=None, features=None):
+    """The (name, class ID) of the members find_members found, before it joined hash tables"""
+    name = name[0] if type(name) == list else name
+    criteria = [(class_ID, lambda m: class_ID in (m.class_id(), m.numerical_class_id())),
+                (name, lambda m: m.name == name), (wn, lambda m: list(m.wn) == wn),
+                (grouping, lambda m: list(m.grouping) == grouping), (features, lambda m: list(m.features) == features)]
+    criteria = [test for value, test in criteria if value]
+    return set([(m.name, m.class_id()) for m in members if criteria and all(test(m) for test in criteria)])
+
+
+def test_find_members_and_themroles():
+    globs = ["give-*", "run-*", "break-*", "send-*"]
+    soups = VerbNetParser(directory=VERBNET_34, class_glob=globs)
+    records = VerbNetParser(directory=VERBNET_34, class_glob=globs, backend="lxml")
+    queries = [{}, {"name": "give", "class_ID": "zzz"}]
+    for m in soups.get_members()[::7]:
+        queries += [{"name": m.name}, {"wn": m.wn}, {"grouping": m.grouping}, {"features": m.features},
+                    {"class_ID": m.numerical_class_id(), "name": [m.name]}, {"class_ID": m.class_id(), "wn": m.wn}]
+    for query in queries:
+        expected = scan_members(soups.get_members(), **query)
+        for members in (soups.get_members(), records.get_members(), records):
+            assert set([(m.name, m.class_id()) for m in search.find_members(members, **query)]) == expected
+    assert [[(m.name, m.class_id()) for m in found] for found in search.find_members_many(records, queries)] == \
+        [[(m.name, m.class_id()) for m in search.find_members(records, **query)] for query in queries]
+
+    for t in soups.get_themroles():
+        for query in [{"class_ID": t.class_id()}, {"role_type": t.role_type},
+                      {"role_type": t.role_type, "sel_restrictions": t.sel_restrictions}]:
+            expected = set([(r.class_id(), r.role_type) for r in soups.get_themroles()
+                            if query.get("class_ID", r.class_id()) == r.class_id()
+                            and query.get("role_type", r.role_type) == r.role_type
+                            and query.get("sel_restrictions") in (None, [], r.sel_restrictions)])
+            for themroles in (soups.get_themroles(), records.get_themroles(), records):
+                assert set([(r.class_id(), r.role_type) for r in search.find_themroles(themroles, **query)]) == \
+                    expected
+
+
+def pairs(results):
+    return [(vc.ID, id(frame)) for vc, frame in results]
+
+
+def class_IDs(results):
+    IDs = []
+    for vc, _ in results:
+        if vc.ID not in IDs:
+            IDs.append(vc.ID)
+    return IDs
+
+
+def test_predicate_index():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    classes = vn.get_verb_classes()
+    values = set([p.value[0] for vc in classes for f in vc.frames for p in f.predicates if p.value])
+    for value in sorted(values) + ["zzz"]:
+        scanned = verbnet.search(classes, value)
+        assert pairs(verbnet.search(vn, value)) == pairs(scanned)
+        assert [vc.ID for vc in search.search_by_predicate(vn, value)] == class_IDs(scanned)
+
+
+def scan_arguments(classes, value, arg_type=None, contains=False):
+    return [(vc, frame) for vc in classes for frame in vc.frames
+            if [(t, v) for p in frame.predicates for t, v in p.argtypes
+                if (value in v if contains else value == v) and arg_type in (None, t)]]
+
+
+def test_argument_index():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    classes = vn.get_verb_classes()
+    queries = [("Agent", None, False), ("Agent", "ThemRole", False), ("e1", "Event", False), ("Agent", "Event", False),
+               ("ch_of", None, True), ("e", None, True), ("_", "Constant", True), ("zzz", None, True)]
+    for value, arg_type, contains in queries:
+        scanned = scan_arguments(classes, value, arg_type, contains)
+        assert pairs(vn.argument_index.find_frames(value, arg_type, contains)) == pairs(scanned)
+        assert search.search_by_argtype(vn, value, contains) == \
+            class_IDs(scan_arguments(classes, value, None, contains))
+
+
+def member_entries(vn):
+    """The (class, subclass, member) of every member, in load order, which is
+    the order the member indexes keep"""
+    return [(vc, c, m) for vc in vn.get_verb_classes() if not vc.is_subclass()
+            for c in [vc] + vc.get_all_subclasses() for m in c.members]
+
+
+def triples(entries):
+    return [(vc.ID, c.ID, id(m)) for vc, c, m in entries]
+
+
+def test_member_index():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    entries = member_entries(vn)
+    names = sorted(set([m.name for _, _, m in entries]))[::11] + ["zzz"]
+    found = vn.lookup_members(names)
+    for name in names:
+        scanned = [e for e in entries if e[2].name == name]
+        assert triples(found[name]) == triples(scanned)
+    classes = [c for c in vn.get_verb_classes() if set(names[:20]) & set([m.name for m in c.members])]
+    assert [c.ID for c in vn.get_verb_classes_by_members(names[:20])] == [c.ID for c in classes]
+
+
+def test_sense_index():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    entries = member_entries(vn)
+    keys = sorted(set([key for _, _, m in entries for key in m.wn]))[::13] + ["zzz%2:40:00", "not a key"]
+    for key in keys:
+        sense = parse_sense_key(key)
+        assert triples(vn.sense_index.lookup(key)) == triples([e for e in entries if sense in e[2].senses])
+    for lemma in ["give", "run", "zzz"]:
+        assert set(triples(vn.sense_index.lemma(lemma))) == \
+            set(triples([e for e in entries if [s for s in e[2].senses if s[0] == lemma]]))
+    assert set(triples(vn.sense_index.lex_file(40))) == \
+        set(triples([e for e in entries if [s for s in e[2].senses if s[1:3] == (2, 40)]]))
+
+
+def test_roleset_index():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    entries = member_entries(vn)
+    rolesets = sorted(set([g for _, _, m in entries for g in m.grouping]))[::9] + ["zzz.01"]
+    for roleset in rolesets:
+        assert triples(vn.roleset_index.lookup(roleset)) == triples([e for e in entries if roleset in e[2].grouping])
+    mapped = vn.map_rolesets(rolesets + rolesets[:3])
+    for roleset, found in zip(rolesets + rolesets[:3], mapped):
+        scanned = []
+        for vc, c, m in entries:
+            if roleset in m.grouping and c.ID not in [ID for ID, _ in scanned]:
+                scanned.append((c.ID, [role.role_type for role in inherited_themroles(vc, c)]))
+        assert [(c.ID, roles) for c, roles in found] == scanned
+
+
+def test_feature_index():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    entries = member_entries(vn)
+    features = vn.feature_index.features()
+    assert features == sorted(set([f for _, _, m in entries for f in m.features]))
+    for query in [features[:1], features[1:3], features[::4], ["zzz"]]:
+        assert set(triples(vn.lookup_features(query, match="any"))) == \
+            set(triples([e for e in entries if set(query) & set(e[2].features)]))
+        assert triples(vn.lookup_features(query, match="all")) == \
+            triples([e for e in entries if set(query) <= set(e[2].features)])
+    for feature_set in list(vn.feature_index.feature_sets())[::3]:
+        assert triples(vn.lookup_features(feature_set, match="exactly")) == \
+            triples([e for e in entries if frozenset(e[2].features) == feature_set])
+
+
+def test_framenet_index():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    entries = member_entries(vn)
+    mapped = [(frame, e) for e in entries for frame in e[2].fn_mapping if frame != "None"]
+    frames = vn.framenet_index.frames()
+    assert frames == sorted(set([frame for frame, _ in mapped]))
+    found = vn.lookup_framenet(frames[::5] + ["zzz"])
+    for frame in frames[::5] + ["zzz"]:
+        assert triples(found[frame]) == triples([e for f, e in mapped if f == frame])
+    names = sorted(set([e[2].name for _, e in mapped]))[::7]
+    for name, name_frames in vn.framenet_frames(names).items():
+        assert set(name_frames) == set([f for f, e in mapped if e[2].name == name])
+    assert vn.framenet_index.pairs() == sorted(set([(f, e[1].ID, e[2].name) for f, e in mapped]))
+
+
+def test_themrole_index():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    classes = vn.get_verb_classes()
+    role_types = sorted(set([t.role_type for t in vn.get_themroles()]))
+    inherited = {}
+    for c in classes:
+        roles = inherited_themroles(vn.verb_classes_dict[c.class_id(False)], c)
+        inherited[c.ID] = set([role.role_type.lower() for role in roles])
+    queries = [[role_type] for role_type in role_types] + [["agent", "Theme"], ["Agent", "Recipient", "Theme"],
+                                                           ["Agent", "zzz"], []]
+    for roles in queries:
+        for only in (False, True):
+            assert [vc.ID for vc in search.search_by_themroles(vn, roles, only)] == \
+                [vc.ID for vc in search.search_by_themroles(classes, roles, only)]
+        assert set([vc.ID for vc in vn.themrole_index.any_of(roles)]) == \
+            set([vc.ID for vc in classes if set([r.lower() for r in roles]) & inherited[vc.ID]])
+
+
+def tree_allows(tree, features):
+    """Walk a restriction tree, like ThematicRole.allows did before the trees were compiled"""
+    if not tree:
+        return True
+    children = [child for child in tree[1:] if child is not None]
+    if tree[0] == "OR":
+        return not children or [child for child in children if tree_allows(child, features)] != []
+    if tree[0] == "AND":
+        return [child for child in children if not tree_allows(child, features)] == []
+    return [value for value, feature in zip(tree[::2], tree[1::2]) if (value == "+") != (feature in features)] == []
+
+
+def test_restriction_index():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    roles = [(vc, role) for vc in vn.get_verb_classes() for role in vc.themroles]
+    slots = [(vc, frame, role) for vc in vn.get_verb_classes() for frame in vc.frames
+             for role in frame.syntax if role.restrictions]
+    features = sorted(set([f[1:] for _, role in roles for f in restriction_features(role.sel_restrictions)] +
+                          [f[1:] for _, _, role in slots for f in restriction_features(role.restriction_tree())]))
+    feature_sets = [[], ["animate", "human"], ["concrete", "solid"], ["location", "region"]] + \
+        [[feature] for feature in features]
+    for feature_set, checked in zip(feature_sets, vn.restriction_index.check_many(feature_sets)):
+        expected = [(vc.ID, id(role)) for vc, role in roles if tree_allows(role.sel_restrictions, feature_set)]
+        assert [(vc.ID, id(role)) for vc, role in vn.restriction_index.check(feature_set)] == expected
+        assert [(vc.ID, id(role)) for vc, role in checked] == expected
+        assert list(vn.restriction_index.slots.allows(feature_set)) == \
+            [tree_allows(role.restriction_tree(), feature_set) for _, _, role in slots]
+    for feature in ["+" + feature for feature in features] + ["-region", "+zzz"]:
+        assert [(vc.ID, id(role)) for vc, role in vn.restriction_index.roles_with(feature)] == \
+            [(vc.ID, id(role)) for vc, role in roles if feature in restriction_features(role.sel_restrictions)]
+
+
+def has_segments(sequence, pattern):
+    """Whether sequence has the segments of pattern in order, a bare token also
+    matching the tokens that start with it and a dot"""
+    def same(token, query):
+        return token == query or token.split(".")[0] == query
+    position = 0
+    for segment in pattern:
+        starts = [i for i in range(position, len(sequence) - len(segment) + 1)
+                  if all(same(sequence[i + j], query) for j, query in enumerate(segment))]
+        if not starts:
+            return False
+        position = starts[0] + len(segment)
+    return True
+
+
+def test_pattern_index():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    frames = [(vc, frame) for vc in vn.get_verb_classes() for frame in vc.frames]
+    index = vn.pattern_index
+
+    def scan(test):
+        return pairs([(vc, frame) for vc, frame in frames if test(frame)])
+
+    for vc, frame in frames[::40]:
+        POS = [role.POS for role in frame.syntax]
+        assert pairs(index.pos(POS)) == scan(lambda f: [role.POS for role in f.syntax] == POS)
+        assert pairs(index.primary(" ".join(frame.primary))) == scan(lambda f: list(f.primary) == list(frame.primary))
+    for tokens, only in [(["NP", "NP"], False), (["np", "verb"], True), (["PREP", "NP", "NP"], False)]:
+        counts = dict((token.upper(), tokens.count(token)) for token in tokens)
+        assert pairs(index.containing(tokens, only=only)) == scan(
+            lambda f: all([role.POS for role in f.syntax].count(t) >= n for t, n in counts.items())
+            and (not only or len(f.syntax) == len(tokens)))
+    for pattern in ["NP V NP ... PP", "V NP", "NP V ... PP.location", "ADV"]:
+        segments = [segment.split() for segment in pattern.split("...")]
+        assert pairs(index.subsequence(pattern)) == scan(lambda f: has_segments(list(f.primary), segments))
+
+
+def test_example_index():
+    vn = VerbNetParser(directory=VERBNET_34, backend="lxml")
+    frames = [(vc, frame) for vc in vn.get_verb_classes() for frame in vc.frames]
+    texts = dict((id(frame), [example_words(example) for example in frame.examples]) for _, frame in frames)
+
+    def has_phrase(frame, words):
+        return [text for text in texts[id(frame)]
+                if [i for i in range(len(text) - len(words) + 1) if text[i:i + len(words)] == words]] != []
+
+    for phrase in ["gave", "the book", "to the", "a fork in the road", "zzz"]:
+        words = example_words(phrase)
+        assert pairs(vn.example_index.phrase(phrase)) == pairs([(vc, f) for vc, f in frames if has_phrase(f, words)])
+    for prefix in ["giv", "sent", "zzz"]:
+        assert pairs(vn.example_index.prefix(prefix)) == \
+            pairs([(vc, f) for vc, f in frames if [w for text in texts[id(f)] for w in text if w.startswith(prefix)]])
+    for query, terms, match in [('john "the book"', ["john", "the book"], "all"),
+                                ("gave sent", ["gave", "sent"], "any"), ("gave sent", ["gave", "sent"], "all")]:
+        terms = [example_words(term) for term in terms]
+        test = all if match == "all" else any
+        results = vn.search_examples(query, match)
+        assert set([id(f) for _, _, f in results]) == \
+            set([id(f) for _, f in frames if test([has_phrase(f, words) for words in terms])])
+        assert [score for score, _, _ in results] == sorted([score for score, _, _ in results], reverse=True)
+
+
+def old_contains(frame, predicates):
+    """Frame.contains before the predicates were compiled: every predicate has
+    one in the frame with the same value and all of its args, ignoring question
+    marks"""
+    def args(p):
+        return set([(t.replace('?', ''), v.replace('?', '')) for t, v in p.argtypes])
+    for search in predicates:
+        if not [p for p in frame.predicates if list(p.value) == list(search.value) and args(search) <= args(p)]:
+            return False
+    return True
+
+
+def test_predicate_patterns():
+    soups = VerbNetParser(directory=VERBNET_34, class_glob=["give-*", "run-*", "send-*", "break-*"])
+    for vn in (soups, VerbNetParser(directory=VERBNET_34, backend="lxml")):
+        frames = [(vc, frame) for vc in vn.get_verb_classes() for frame in vc.frames]
+        for _, pattern in frames[::29]:
+            for predicates in (list(pattern.predicates), list(pattern.predicates[:1]), []):
+                expected = pairs([(vc, f) for vc, f in frames if old_contains(f, predicates)])
+                assert pairs(vn.match_all(predicates)) == expected
+                assert pairs(PredicatePattern(predicates).match_all(frames)) == expected
+                assert [f.contains(predicates) for _, f in frames[::13]] == \
+                    [old_contains(f, predicates) for _, f in frames[::13]]
+            assert pairs(vn.match_all(pattern)) == \
+                pairs([(vc, f) for vc, f in frames if old_contains(f, pattern.predicates)])
@@ -0,0 +1,39 @@
+import os
+import sys
+
+local_verbnet_api_path = "../"
+
+sys.path.append(local_verbnet_api_path)
+from verbnet import *
+import verbnetgl
+
+VERBNET_34 = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../verbnet3.4")
+
+SUBSTRINGS = ["ch_of_", "tr_of_info", "Agent", "E", "Theme"]
+
+
+def gl_tests(gl):
+    return [gl.is_motion_class()] + [gl.has_argtype_containing(substring) for substring in SUBSTRINGS]
+
+
+def test_gl_class_tests_use_the_frame_indexes(monkeypatch):
+    vn = VerbNetParser(directory=VERBNET_34, class_glob=["run-*", "give-*", "break-*", "tell-*"])
+    classes = vn.get_verb_classes()
+    # Without a parser, the frames are scanned
+    scanned = {}
+    for vc in classes:
+        vc.parser = None
+        scanned[vc.ID] = gl_tests(verbnetgl.GLVerbClass(vc))
+        vc.parser = vn
+    assert [vc.ID for vc in classes if scanned[vc.ID][0]] == [vc.ID for vc in classes if vc.ID.startswith("run")]
+
+    # GLFrame uses is_motion_frame itself while it is built
+    gl_classes = [verbnetgl.GLVerbClass(vc) for vc in classes]
+
+    def scan(*args):
+        raise AssertionError("scanned the frames instead of using the index")
+    monkeypatch.setattr(verbnetgl.GLFrame, "is_motion_frame", scan)
+    monkeypatch.setattr(verbnetgl.GLVerbClass, "argtypes", scan)
+    for gl in gl_classes:
+        assert gl.frame_index("predicates") is vn.predicate_index
+        assert gl_tests(gl) == scanned[gl.ID]
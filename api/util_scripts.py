@@ -13,24 +13,38 @@ def get_verb_specific_feature_set(vn_classes):
 
 # Given a set of VN classes, and a set of features,
 # returns a dict of {class: [(member with one of those features, feature set for member)]}
+# vn_classes can also be a VerbNetParser, in which case its feature index is used
 def get_classes_and_members_by_features(vn_classes, features):
+  if isinstance(vn_classes, VerbNetParser):
+    return group_members_by_class(vn_classes.lookup_features(features, match="any"))
+  features = set(features)
   classes_and_members = {}
   for verb_class in vn_classes:
     for member in verb_class.members:
-      if not set(features).isdisjoint(member.features):
+      if not features.isdisjoint(member.features):
         classes_and_members.setdefault(verb_class.ID, []).append(member)
 
   return classes_and_members
 
 def get_classes_and_members_by_exact_feature_set(vn_classes, features):
+  if isinstance(vn_classes, VerbNetParser):
+    return group_members_by_class(vn_classes.lookup_features(features, match="exactly"))
+  features = frozenset(features)
   classes_and_members = {}
   for verb_class in vn_classes:
     for member in verb_class.members:
-      if set(features) == set(member.features):
+      if features == frozenset(member.features):
         classes_and_members.setdefault(verb_class.ID, []).append(member)
 
   return classes_and_members
 
+def group_members_by_class(entries):
+  classes_and_members = {}
+  for _, verb_class, member in entries:
+    classes_and_members.setdefault(verb_class.ID, []).append(member)
+
+  return classes_and_members
+
 
 # ISSUE IS THAT SOME MAPPiNGS POINT TO SUBCLASSES, NEED TO MAP THESE CORRECTLY
 def update_fn_mapping():
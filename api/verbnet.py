@@ -9,26 +9,88 @@ verb frames.
 import os
 import bs4
 import re
+import fnmatch
+import gc
+import hashlib
+import pickle
+import threading
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree
+
+from indexes import *
 
 __author__ = ["Todd Curcuru & Marc Verhagen"]
 __date__ = "3/15/2016"
 __email__ = ["tcurcuru@brandeis.edu, marc@cs.brandeis.edu"]
 
 
-def get_verbnet_directory(version):
-    for line in open(os.path.join(os.path.dirname(__file__), 'config.txt')):
-        if line.startswith('VERBNET_PATH') and line.split("=")[0].strip().endswith(version):
-            return line.split('=')[1].strip()
-    exit('WARNING: could not find a value for VERBNET_PATH version %s' % version)
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config.txt')
+_configs = {}
+
+DOCTYPE = '<!DOCTYPE VNCLASS SYSTEM "vn_class-3.dtd">\n'
+
+
+def read_config(path=CONFIG_PATH):
+    """Return the {name: value} settings of a config.txt, read only once per path"""
+    if path not in _configs:
+        config = {}
+        for line in open(path):
+            if "=" in line and not line.startswith("//"):
+                name, value = line.split("=", 1)
+                config[name.strip()] = value.strip()
+        _configs[path] = config
+    return _configs[path]
+
+
+def get_verbnet_directory(version, config_path=CONFIG_PATH):
+    for name, value in read_config(config_path).items():
+        if name.startswith('VERBNET_PATH') and name.endswith(version):
+            return value
+    raise Exception('could not find a value for VERBNET_PATH version %s in %s' % (version, config_path))
 
 
 class VerbNetParser(object):
     """Parse VerbNet XML files, and turn them into a list of BeautifulSoup
     objects"""
 
-    def __init__(self, max_count=None, directory=None, file_list=None, version=None):
+    def __init__(self, max_count=None, directory=None, file_list=None, version=None, lazy=False,
+                 workers=None, backend="bs4", cache=None, class_glob=None, class_regex=None, class_prefix=None,
+                 interner=None):
         """Take all verbnet files, if max_count is used then take the first max_count
-        files, if file_list is used, read the filenames from the file."""
+        files, if file_list is used, read the filenames from the file.
+
+        The files can also be selected by their class ID (the file name), with
+        class_glob (e.g. "run-*"), class_regex (searched for in the ID) or
+        class_prefix, a numerical ID that selects that class and everything
+        numbered under it (e.g. "51" or "51.*" for all of 51.x). Each of these
+        takes a string or a list of them, and a file has to match one of the
+        patterns of every selector given. Only the selected files are opened.
+
+        If lazy is set, only the class IDs are read up front, and the files are
+        parsed the first time one of their classes is looked up through
+        verb_classes_dict, verb_classes_numerical_dict or get_verb_classes.
+
+        If workers is set, the files are parsed by a pool of that many processes,
+        which send back soup-free VerbClassRecords instead of VerbClasses. The
+        records are read-only, and parsed_files stays empty.
+
+        backend="lxml" reads the files with lxml.etree.iterparse instead of
+        BeautifulSoup, and also gives read-only VerbClassRecords. This is the
+        fastest way to load VerbNet for anything that only queries it.
+
+        cache keeps a snapshot of the VerbClassRecords on disk (see
+        SnapshotCache), either at the given path or, for cache=True, in the
+        default cache directory. It gives VerbClassRecords whatever the backend,
+        and only the files that changed since the snapshot was written are
+        parsed again, with that backend. A lazy parser has no snapshot, so
+        cache cannot be used with lazy, which raises a ValueError.
+
+        interner (see corpus.Interner) replaces the parts of every
+        VerbClassRecord with shared ones as the record is added, before
+        anything indexes it."""
+        if cache and lazy:
+            raise ValueError("cache cannot be used with lazy, a lazy parser does not load a snapshot")
         if directory:
             VERBNET_PATH = directory
         elif version:
@@ -38,28 +100,405 @@ class VerbNetParser(object):
             # (currently 3.4, pointed to in config.txt)
             VERBNET_PATH = get_verbnet_directory("3.4")
 
-        fnames = [f for f in os.listdir(VERBNET_PATH) if f.endswith(".xml")]
-        self.filenames = [os.path.join(VERBNET_PATH, fname) for fname in fnames]
-
-        if max_count is not None:
-            fnames = fnames[:max_count]
+        self.directory = VERBNET_PATH
+        self.max_count = max_count
+        self.file_list = None
         if file_list is not None:
-            fnames = ["%s.xml" % f for f in open(file_list).read().split()]
+            self.file_list = ["%s.xml" % f for f in open(file_list).read().split()]
+            for fname in set(self.file_list) - set(os.listdir(VERBNET_PATH)):
+                print("WARNING: %s from %s is not in %s" % (fname, file_list, VERBNET_PATH))
+        self.class_glob = class_glob
+        self.class_regex = class_regex
+        self.class_prefix = class_prefix
+        self.filenames = self._list_files()
 
         self.version = version
-        self.parsed_files = self.parse_files()
+        self.lazy = lazy
+        # Everything but plain BeautifulSoup parsing gives read-only VerbClassRecords
+        self.records = bool(workers or cache or backend == "lxml")
+        self.backend = backend
+        self.interner = interner
+        self.parsed_files = []
+        # The IDs of the classes parsed from each file, its soup if there is one,
+        # and its (mtime, size, sha1) at the time, for refresh()
+        self._file_classes = {}
+        self._file_soups = {}
+        self._file_states = {}
+        self._refresh_lock = threading.RLock()
+        self._watcher = None
+        # Inverted index of the members: name -> [(class, subclass, member)],
+        # in load order, and the entries each file added to it (which also go
+        # in the sense_index, roleset_index, feature_index and framenet_index)
+        self.member_index = {}
+        self._file_members = {}
+        # Predicate values, ARGs, syntax and example words -> frames and classes
+        # (see the predicate_index, argument_index, pattern_index and
+        # example_index properties), and the top level class of each file
+        self._frame_indexes = None
+        self._sense_index = SenseIndex()
+        self._roleset_index = RolesetIndex()
+        self._feature_index = FeatureIndex()
+        self._framenet_index = FrameNetIndex()
+        self.themrole_index = ThemroleIndex(self)
+        self.hierarchy = HierarchyIndex(self)
+        self.restriction_index = RestrictionIndex(self)
+        self._file_top_classes = {}
+
+        if lazy:
+            self.verb_classes_dict = LazyVerbClassDict(self)
+            self.verb_classes_numerical_dict = LazyVerbClassDict(self, numerical=True)
+            self._index_files()
+            return
+
         self.verb_classes_dict = {}
         # For lookup when classname is not available
         # As in the annotation files
         self.verb_classes_numerical_dict = {}
 
-        for parse in self.parsed_files:
-            vc = VerbClass(parse.VNCLASS, version)
-            self.verb_classes_dict[vc.ID] = vc
-            self.verb_classes_numerical_dict["-".join(vc.ID.split("-")[1:])] = vc
-            for sub in vc.get_all_subclasses():
-                self.verb_classes_dict[sub.ID] = sub
-                self.verb_classes_numerical_dict["-".join(sub.ID.split("-")[1:])] = sub
+        if cache:
+            selection = (self.file_list, class_glob, class_regex, class_prefix, max_count)
+            self.cache = SnapshotCache(VERBNET_PATH, version, None if cache is True else cache, selection)
+            classes = self.cache.load(self.filenames, workers, backend)
+            self._file_states = dict((fname, self.cache.files[os.path.basename(fname)][:3])
+                                     for fname in self.filenames)
+        else:
+            # Hashed, so that refresh() can tell a file that was only touched
+            self._file_states = dict((fname, file_state(fname, hashed=True)) for fname in self.filenames)
+            if self.records:
+                classes = self.parse_records(workers)
+            else:
+                self.parsed_files = self.parse_files()
+                self._file_soups = dict(zip(self.filenames, self.parsed_files))
+                classes = [VerbClass(parse.VNCLASS, version) for parse in self.parsed_files]
+
+        for fname, vc in zip(self.filenames, classes):
+            self._add_verb_class(vc, fname)
+
+    def _list_files(self):
+        return list_class_files(self.directory, self.file_list, self.class_glob, self.class_regex,
+                                self.class_prefix, self.max_count)
+
+    def _add_verb_class(self, vc, fname=None):
+        """Register a top level class and all of its subclasses in the lookup dicts"""
+        if self.interner is not None and isinstance(vc, VerbClassRecord):
+            vc = self.interner.record(vc)
+        for c in [vc] + vc.get_all_subclasses():
+            self.verb_classes_dict[c.ID] = c
+            self.verb_classes_numerical_dict["-".join(c.ID.split("-")[1:])] = c
+            if isinstance(c, VerbClass):
+                c.parser = self
+        if fname:
+            self._file_classes[fname] = [c.ID for c in [vc] + vc.get_all_subclasses()]
+            self._file_members[fname] = self._index_members(vc)
+            self._file_top_classes[fname] = vc
+        if self._frame_indexes is not None:
+            for index in self._frame_indexes.values():
+                index.add_class(vc)
+        self.themrole_index.invalidate()
+        self.hierarchy.invalidate()
+        self.restriction_index.invalidate()
+
+    def _built_frame_indexes(self):
+        """The frame indexes, built over all classes the first time one of them
+        is used. After that they are kept up to date as classes are added and
+        dropped. A lazy parser parses the files it has not (or no longer, after
+        refresh()) parsed first"""
+        if self.lazy:
+            self._load_all()
+        if self._frame_indexes is None:
+            with self._refresh_lock:
+                if self._frame_indexes is None:
+                    indexes = [PredicateIndex(), ArgumentIndex(), FramePatternIndex(), ExampleIndex()]
+                    for fname in self.filenames:
+                        if fname in self._file_top_classes:
+                            for index in indexes:
+                                index.add_class(self._file_top_classes[fname])
+                    self._frame_indexes = dict((index.name, index) for index in indexes)
+        return self._frame_indexes
+
+    @property
+    def predicate_index(self):
+        return self._built_frame_indexes()["predicates"]
+
+    @property
+    def argument_index(self):
+        return self._built_frame_indexes()["arguments"]
+
+    @property
+    def pattern_index(self):
+        return self._built_frame_indexes()["patterns"]
+
+    @property
+    def example_index(self):
+        return self._built_frame_indexes()["examples"]
+
+    def _all_loaded(self, index):
+        # A lazy parser only indexes the members of the files it has parsed
+        if self.lazy:
+            self._load_all()
+        return index
+
+    @property
+    def sense_index(self):
+        return self._all_loaded(self._sense_index)
+
+    @property
+    def roleset_index(self):
+        return self._all_loaded(self._roleset_index)
+
+    @property
+    def feature_index(self):
+        return self._all_loaded(self._feature_index)
+
+    @property
+    def framenet_index(self):
+        return self._all_loaded(self._framenet_index)
+
+    def _index_members(self, vc):
+        """Add the members of a top level class and its subclasses to
+        member_index, and return the (name, entry) pairs that were added"""
+        return [self._index_member(vc, c, m) for c in [vc] + vc.get_all_subclasses() for m in c.members]
+
+    def _index_member(self, vc, c, m):
+        entry = (vc, c, m)
+        self.member_index.setdefault(m.name, []).append(entry)
+        self._sense_index.add_member(entry)
+        self._roleset_index.add_member(entry)
+        self._feature_index.add_member(entry)
+        self._framenet_index.add_member(entry)
+        return m.name, entry
+
+    def _unindex_member(self, name, entry):
+        self._sense_index.remove_member(entry)
+        self._roleset_index.remove_member(entry)
+        self._feature_index.remove_member(entry)
+        self._framenet_index.remove_member(entry)
+        entries = [e for e in self.member_index.get(name, []) if e is not entry]
+        if entries:
+            self.member_index[name] = entries
+        else:
+            self.member_index.pop(name, None)
+
+    def _member_added(self, c, member):
+        """Called by VerbClass.add_member, to index the new member"""
+        vc = self.verb_classes_dict[c.top_class_ID]
+        for fname in [fname for fname, top in self._file_top_classes.items() if top is vc]:
+            self._file_members[fname].append(self._index_member(vc, c, member))
+
+    def _member_removed(self, c, member):
+        """Called by VerbClass.remove_member"""
+        for fname, added in self._file_members.items():
+            for name, entry in [(name, entry) for name, entry in added if entry[2] is member]:
+                self._unindex_member(name, entry)
+                added.remove((name, entry))
+
+    def reindex_members(self):
+        """Rebuild member_index and the other member indexes from the classes"""
+        self.member_index = {}
+        self._sense_index = SenseIndex()
+        self._roleset_index = RolesetIndex()
+        self._feature_index = FeatureIndex()
+        self._framenet_index = FrameNetIndex()
+        for fname in self._file_classes:
+            vc = self.verb_classes_dict[self._file_classes[fname][0]]
+            self._file_members[fname] = self._index_members(vc)
+
+    def _index_files(self):
+        """Map the ID of every top level class to the file it lives in, using
+        only the ID attribute of the root VNCLASS, so that nothing else gets
+        parsed until it is needed"""
+        self._class_files = {}
+        self._numerical_class_files = {}
+        self._loaded_files = set()
+        for fname in self.filenames:
+            self._index_file(fname)
+
+    def _index_file(self, fname):
+        self._file_states.setdefault(fname, file_state(fname, hashed=True))
+        ID = get_root_class_id(fname)
+        self._class_files[ID] = fname
+        self._numerical_class_files["-".join(ID.split("-")[1:])] = fname
+
+    def _load_file(self, fname):
+        """Parse a single file and add its classes to the lookup dicts. This
+        holds the refresh lock, so that it does not run into a watch() thread"""
+        with self._refresh_lock:
+            # Files are hashed before they are parsed, unless they already were
+            # when they were indexed (by a lazy parser)
+            if self._file_states.get(fname, (None, None, None))[2] is None:
+                self._file_states[fname] = file_state(fname, hashed=True)
+            if self.lazy:
+                self._loaded_files.add(fname)
+            if self.records:
+                parse_record = iterparse_class_record if self.backend == "lxml" else parse_class_record
+                self._add_verb_class(parse_record(fname, self.version), fname)
+                return
+            parse = bs4.BeautifulSoup(open(fname), "lxml-xml")
+            self.parsed_files.append(parse)
+            self._file_soups[fname] = parse
+            self._add_verb_class(VerbClass(parse.VNCLASS, self.version), fname)
+
+    def _unload_file(self, fname):
+        """Drop the classes (and soup) that were parsed from a file"""
+        for ID in self._file_classes.pop(fname, []):
+            for classes, key in [(self.verb_classes_dict, ID),
+                                 (self.verb_classes_numerical_dict, "-".join(ID.split("-")[1:]))]:
+                try:
+                    del classes[key]
+                except KeyError:
+                    # Already replaced by (and dropped with) another file defining the same class
+                    pass
+        if fname in self._file_top_classes:
+            vc = self._file_top_classes.pop(fname)
+            if self._frame_indexes is not None:
+                for index in self._frame_indexes.values():
+                    index.remove_class(vc)
+            self.themrole_index.invalidate()
+            self.hierarchy.invalidate()
+            self.restriction_index.invalidate()
+        for name, entry in self._file_members.pop(fname, []):
+            self._unindex_member(name, entry)
+        soup = self._file_soups.pop(fname, None)
+        if soup is not None:
+            self.parsed_files[:] = [parse for parse in self.parsed_files if parse is not soup]
+        if self.lazy:
+            self._loaded_files.discard(fname)
+            for files in [self._class_files, self._numerical_class_files]:
+                for ID in [ID for ID, f in files.items() if f == fname]:
+                    del files[ID]
+
+    def _load_class(self, class_ID, numerical=False):
+        """Parse the file holding class_ID (or any of its subclasses), if it has
+        not been parsed yet. The file is found through the top level class ID,
+        falling back to the top level numerical ID for subclasses"""
+        numerical_ID = class_ID if numerical else "-".join(class_ID.split("-")[1:])
+        with self._refresh_lock:
+            fname = None if numerical else self._class_files.get(class_ID)
+            if fname is None:
+                fname = self._numerical_class_files.get(numerical_ID.split("-")[0])
+            if fname is not None and fname not in self._loaded_files:
+                self._load_file(fname)
+
+    def _load_all(self):
+        with self._refresh_lock:
+            loaded = bool(self._loaded_files)
+            missing = [fname for fname in self.filenames if fname not in self._loaded_files]
+            for fname in missing:
+                self._load_file(fname)
+            # Files that were used first were loaded first
+            if missing and loaded:
+                self._restore_file_order()
+
+    def _file_changed(self, fname):
+        """Whether a file changed since it was parsed. Files with the same mtime
+        and size are taken as unchanged, otherwise the hash decides, so that a
+        file that was only touched is not parsed again"""
+        mtime, size, sha1 = self._file_states[fname]
+        state = file_state(fname, hashed=True)
+        if state[:2] == (mtime, size):
+            return False
+        self._file_states[fname] = state
+        # Without a hash there is nothing to compare with
+        return sha1 is None or state[2] != sha1
+
+    def refresh(self):
+        """Bring the classes up to date with the XML files in the directory.
+
+        Only the files that were added or modified since they were parsed are
+        parsed again, and the classes of removed files are dropped, all in place
+        in verb_classes_dict and verb_classes_numerical_dict, which (like the
+        indexes) keep the order of a fresh load. A lazy parser only updates its
+        file index, and reparses files as they get used.
+
+        Returns the lists of (added, removed, modified) files"""
+        with self._refresh_lock:
+            filenames = self._list_files()
+            added = [fname for fname in filenames if fname not in self._file_states]
+            removed = [fname for fname in self._file_states if fname not in filenames]
+            modified = [fname for fname in filenames if fname in self._file_states and self._file_changed(fname)]
+
+            for fname in removed + modified:
+                self._unload_file(fname)
+            for fname in removed:
+                del self._file_states[fname]
+            self.filenames = filenames
+
+            for fname in added + modified:
+                try:
+                    if self.lazy:
+                        self._index_file(fname)
+                    else:
+                        self._load_file(fname)
+                except Exception:
+                    # Forget the file (it may be half written), so the next refresh tries it again
+                    self._file_states.pop(fname, None)
+                    raise
+
+            if (added or modified) and not self.lazy:
+                self._restore_file_order()
+
+            if getattr(self, "cache", None) and (added or removed or modified):
+                for fname in removed:
+                    del self.cache.files[os.path.basename(fname)]
+                for fname in added + modified:
+                    self.cache.files[os.path.basename(fname)] = file_state(fname, hashed=True) + \
+                                              (self.verb_classes_dict[self._file_classes[fname][0]],)
+                self.cache.write()
+
+            return added, removed, modified
+
+    def _restore_file_order(self):
+        """Put the classes, and the entries of the indexes, back in the order
+        of the files, which is the order a fresh load gives them, after refresh()
+        added the classes of new and modified files at the end, or a lazy parser
+        loaded them in the order they were used"""
+        order = dict((fname, i) for i, fname in enumerate(self.filenames))
+        files = sorted(self._file_classes, key=order.get)
+        positions = dict((ID, (order[fname], i)) for fname in files for i, ID in enumerate(self._file_classes[fname]))
+        last = (len(files), 0)
+        for classes in [self.verb_classes_dict, self.verb_classes_numerical_dict]:
+            # The dict itself for a lazy parser, which would load files when gone through
+            classes = getattr(classes, "data", classes)
+            items = sorted(classes.items(), key=lambda item: positions.get(item[1].ID, last))
+            classes.clear()
+            classes.update(items)
+        for by_file in [self._file_classes, self._file_top_classes, self._file_members, self._file_soups]:
+            items = sorted(by_file.items(), key=lambda item: order.get(item[0], len(files)))
+            by_file.clear()
+            by_file.update(items)
+        self.parsed_files[:] = list(self._file_soups.values())
+        self.reindex_members()
+        # Built again, in file order, the next time one of them is used
+        self._frame_indexes = None
+
+    def watch(self, interval=5.0, callback=None):
+        """Start a daemon thread that calls refresh() every interval seconds,
+        and callback(added, removed, modified) when anything changed. Errors
+        (like a file caught half written) are printed, and tried again on the
+        next poll. Stop it with stop_watching()"""
+        self.stop_watching()
+        stop = threading.Event()
+
+        def poll():
+            while not stop.wait(interval):
+                try:
+                    changes = self.refresh()
+                except Exception as e:
+                    print("WARNING: could not refresh %s: %s" % (self.directory, e))
+                    continue
+                if callback and any(changes):
+                    callback(*changes)
+
+        self._watcher = (threading.Thread(target=poll, daemon=True), stop)
+        self._watcher[0].start()
+        return self._watcher[0]
+
+    def stop_watching(self):
+        if self._watcher:
+            thread, stop = self._watcher
+            stop.set()
+            thread.join()
+            self._watcher = None
 
     def parse_files(self):
         """Parse a list of XML files using BeautifulSoup. Returns list of parsed
@@ -69,6 +508,14 @@ class VerbNetParser(object):
             parsed_files.append(bs4.BeautifulSoup(open(fname), "lxml-xml"))
         return parsed_files
 
+    def parse_records(self, workers=None, filenames=None):
+        """Parse the files (all of self.filenames by default) into
+        VerbClassRecords, with the configured backend, optionally in a pool of
+        worker processes. The records are returned in the same order as the
+        files"""
+        filenames = self.filenames if filenames is None else filenames
+        return parse_records(filenames, self.version, workers, self.backend)
+
     def get_verb_classes(self, class_list=[]):
         """Return a list of all classes, which can be scoped by a list of class_ID's.
         look through subclasses too depending on the flag"""
@@ -82,17 +529,80 @@ class VerbNetParser(object):
         if type(members_list) != list:
             members_list = [members_list]
 
-        if type(members_list[0]) == Member:
+        if type(members_list[0]) in [Member, MemberRecord]:
             members_list = [m.name for m in members_list]
         elif type(members_list[0]) != str:
             raise Exception("get_verb_classes_by_members requires a list of Members or strings")
 
-        v_classes = []
-        for vc in self.verb_classes_dict.values():
-            if list(set(members_list) & set([m.name for m in vc.members])):
-                v_classes.append(vc)
-                continue
-        return v_classes
+        found = set([id(vc) for name in members_list for _, vc, _ in self._member_entries(name)])
+        # In the order of the classes, like going through them did
+        return [vc for vc in self.verb_classes_dict.values() if id(vc) in found]
+
+    def _member_entries(self, name):
+        # A lazy parser only knows the members of the files it has parsed
+        if self.lazy:
+            self._load_all()
+        return self.member_index.get(name, [])
+
+    def map_rolesets(self, rolesets):
+        """Map a sequence of PropBank rolesets to [(class, role types), ...]
+        each, see RolesetIndex.map_rolesets"""
+        return self.roleset_index.map_rolesets(rolesets)
+
+    def lookup_features(self, features, match="any"):
+        """Return the [(class, subclass, member), ...] whose features include
+        any of features (match="any"), all of them (match="all"), or are
+        exactly that set (match="exactly"), see FeatureIndex"""
+        if match not in ("any", "all", "exactly"):
+            raise Exception("match should be any, all or exactly, not %s" % match)
+        return getattr(self.feature_index, match if match == "exactly" else match + "_of")(features)
+
+    def match_all(self, pattern):
+        """Return [(class, frame), ...] for every frame that contains pattern (a
+        PredicatePattern, or the list of Predicates or Frame to compile one
+        from, see Frame.contains). Only the frames that have the rarest of the
+        predicate values of the pattern are tested"""
+        if self.lazy:
+            self._load_all()
+        if type(pattern) != PredicatePattern:
+            pattern = PredicatePattern(pattern)
+        if pattern.values:
+            candidates = min([self.predicate_index.frames(value) for value in pattern.values], key=len)
+        else:
+            candidates = [(vc, frame) for vc in self.get_verb_classes() for frame in vc.frames]
+        return pattern.match_all(candidates)
+
+    def search_examples(self, query, match="all", under=None, predicate=None, limit=None):
+        """Return [(score, class, frame), ...] for the frames with examples that
+        match query, best first (see ExampleIndex.search). Results can be kept
+        to the classes under a class ID or numerical ID prefix (like "13.1"),
+        and to the frames with a predicate (like "motion")"""
+        if self.lazy:
+            self._load_all()
+        classes = frames = None
+        if under is not None:
+            classes = [c for vc in self.hierarchy.subtree(under) for c in [vc] + vc.get_all_subclasses()]
+        if predicate is not None:
+            frames = [frame for _, frame in self.predicate_index.frames(predicate)]
+        return self.example_index.search(query, match, classes, frames, limit)
+
+    def lookup_framenet(self, fn_frames):
+        """Return {FrameNet frame: [(class, subclass, member), ...]} for a list
+        of frames (like "Giving"), from the fn_mapping of the members"""
+        return self.framenet_index.members_of(fn_frames)
+
+    def framenet_frames(self, names):
+        """Return {member name: [FrameNet frames]} for a list of member names"""
+        return self.framenet_index.frames_of(names)
+
+    def lookup_members(self, names):
+        """Return {name: [(class, subclass, member), ...]} for a list of member
+        names, through the member index. class is the top level class, and
+        subclass the (sub)class that lists the member, which is class itself
+        for the members of a top level class. Unknown names get an empty list"""
+        if isinstance(names, str):
+            names = [names]
+        return dict((name, list(self._member_entries(name))) for name in names)
 
     def get_members(self, class_list=[]):
         """Return a list of members from all VerbNet classes
@@ -122,28 +632,341 @@ class VerbNetParser(object):
 
         return frames
 
-    def check_vn(self, vn_class, verb, vn, update=False):
+    def check_vn(self, vn_class, verb, vn=None, update=False):
+        """Return vn_class (a numerical ID like "13.1-1") if verb is a member of
+        that class. Otherwise, with update, vn_class is resolved to its longest
+        prefix that is a class, and the numerical ID of the class closest to it
+        that has the verb is returned, looking in its subclasses first and then
+        further up, as far as its top level class. Returns False if there is no
+        such class"""
         if not vn_class:
             return False
+        # Looking the class up first also parses its file for a lazy parser
         if vn_class in self.verb_classes_numerical_dict:
-            if verb in [m.name for m in self.verb_classes_numerical_dict[vn_class].members]:
+            if [c for _, c, _ in self.member_index.get(verb, []) if c.numerical_ID == vn_class]:
                 return vn_class
         if update:
-            if vn_class not in self.verb_classes_numerical_dict:
-                if vn_class.split("-")[0] in self.verb_classes_numerical_dict:
-                    vn_class = vn_class.split("-")[0]
-                else:
-                    return False
+            subclass = self.hierarchy.closest_class(vn_class, [c for _, c, _ in self.member_index.get(verb, [])])
+            if subclass is not None:
+                return subclass.numerical_ID
+        return False
 
-            for subclass in [self.verb_classes_numerical_dict[vn_class.split("-")[0]]] + self.verb_classes_numerical_dict[vn_class.split("-")[0]].get_all_subclasses():
-                if verb in [m.name for m in subclass.get_members()]:
-                    return subclass.numerical_ID
+    def check_vn_many(self, pairs, update=False):
+        """check_vn for a sequence of (vn_class, verb) pairs, like those of an
+        annotation file, returning the results in the same order. Each distinct
+        pair is only checked once"""
+        checked = {}
+        results = []
+        for vn_class, verb in pairs:
+            if (vn_class, verb) not in checked:
+                checked[(vn_class, verb)] = self.check_vn(vn_class, verb, update=update)
+            results.append(checked[(vn_class, verb)])
+        return results
+
+def list_class_files(directory, file_list=None, class_glob=None, class_regex=None, class_prefix=None,
+                     max_count=None):
+    """Return the paths of the XML files in the directory, limited to the
+    ones in file_list (a list of file names), the ones selected by the class
+    selectors and max_count"""
+    fnames = [f for f in os.listdir(directory) if f.endswith(".xml")]
+    if file_list is not None:
+        present = set(fnames)
+        fnames = [f for f in file_list if f in present]
+    fnames = [f for f in fnames if class_selected(f[:-len(".xml")], class_glob, class_regex, class_prefix)]
+    if max_count is not None:
+        fnames = fnames[:max_count]
+    return [os.path.join(directory, fname) for fname in fnames]
+
+
+def iter_verb_classes(directory=None, version=None, backend="bs4", write_back=None, max_count=None,
+                      class_glob=None, class_regex=None, class_prefix=None):
+    """Parse the files of a directory one at a time and yield the top level
+    class of each, for jobs that only need a single pass over VerbNet. Files
+    are selected like in VerbNetParser.
+
+    Nothing is kept from one file to the next: when the next class is asked
+    for, or the loop over the classes is left early, write_back(vc, fname) is
+    called if given (class_writer makes one that saves the class XML), and the
+    soup of the class is destroyed. So the class and everything taken from it
+    are only valid until then, and memory stays at about what the largest file
+    needs.
+
+    backend="lxml" yields read-only VerbClassRecords instead of VerbClasses."""
+    if not directory:
+        directory = get_verbnet_directory(version or "3.4")
+    for fname in list_class_files(directory, None, class_glob, class_regex, class_prefix, max_count):
+        parse = None
+        if backend == "lxml":
+            vc = iterparse_class_record(fname, version)
+        else:
+            parse = bs4.BeautifulSoup(open(fname), "lxml-xml")
+            vc = VerbClass(parse.VNCLASS, version)
+        try:
+            yield vc
+        finally:
+            # Also on a break (GeneratorExit), so the last class is not lost
+            if write_back:
+                write_back(vc, fname)
+            # The tree is full of parent/child cycles, so breaking it up now
+            # frees it without waiting for the garbage collector
+            if parse is not None:
+                parse.decompose()
+        del vc, parse
+
+
+def class_writer(output_dir, doctype=DOCTYPE):
+    """Return a write_back hook for iter_verb_classes that saves each class,
+    pretty printed, to a file with the same name in output_dir"""
+    def write(vc, fname):
+        with open(os.path.join(output_dir, os.path.basename(fname)), "w") as f:
+            f.write(doctype)
+            f.write(vc.pp())
+    return write
+
+
+def class_selected(class_ID, class_glob=None, class_regex=None, class_prefix=None):
+    """Check a class ID against the selectors of VerbNetParser. Every selector
+    that is given must have at least one matching pattern"""
+    def patterns(selector):
+        return [selector] if isinstance(selector, str) else selector
+
+    if class_glob and not [g for g in patterns(class_glob) if fnmatch.fnmatchcase(class_ID, g)]:
+        return False
+    if class_regex and not [r for r in patterns(class_regex) if re.search(r, class_ID)]:
         return False
+    if class_prefix:
+        numerical_ID = "-".join(class_ID.split("-")[1:])
+        prefixes = [p[:-len(".*")] if p.endswith(".*") else p for p in patterns(class_prefix)]
+        if not [p for p in prefixes if numerical_ID == p or numerical_ID.startswith(p + ".")
+                or numerical_ID.startswith(p + "-")]:
+            return False
+    return True
+
+
+def file_state(fname, hashed=False):
+    """Return (mtime, size, sha1) for a file, the sha1 is None unless hashed is set"""
+    stat = os.stat(fname)
+    return stat.st_mtime_ns, stat.st_size, file_sha1(fname) if hashed else None
+
+
+def file_sha1(fname):
+    with open(fname, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def parse_records(filenames, version=None, workers=None, backend="lxml"):
+    """Parse a list of files into VerbClassRecords, in order, optionally in a
+    pool of worker processes"""
+    parse_record = iterparse_class_record if backend == "lxml" else parse_class_record
+    versions = [version] * len(filenames)
+    if not workers:
+        return list(map(parse_record, filenames, versions))
+    # A few chunks per worker keeps the pool busy without paying the
+    # round trip for every single file
+    chunksize = max(1, len(filenames) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(parse_record, filenames, versions, chunksize=chunksize))
+
+
+class SnapshotCache(object):
+    """Binary snapshot of the VerbClassRecords parsed from a directory.
+
+    The snapshot is a pickle keyed on the directory (with its symlinks
+    resolved), the version and the selection of files (the selectors of
+    VerbNetParser), so that parsers over different directories or subsets of
+    one get snapshots of their own. It holds the mtime, size and sha1 of every
+    file, by file name, next to the record parsed from it. A file
+    whose mtime and size did not change is trusted as is, a file that only got
+    touched is recognized by its hash, and everything else is parsed again and
+    patched into the snapshot, which is then written back."""
+
+    # Bump this when the record classes change, so that old snapshots get ignored
+    FORMAT = 8
+
+    def __init__(self, directory, version=None, path=None, selection=None):
+        self.directory = os.path.realpath(directory)
+        self.version = version
+        self.selection = selection
+        if path is None:
+            cache_dir = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "verbnet")
+            key = repr((self.directory, self.version, self.selection))
+            path = os.path.join(cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pickle")
+        self.path = path
+        self.files = {}
+
+    def read(self):
+        """Return the {file name: (mtime, size, sha1, record)} entries of the
+        snapshot on disk, or nothing if it is missing or for something else"""
+        # Unpickling creates lots of small objects, which would otherwise keep
+        # triggering the garbage collector for nothing
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(self.path, "rb") as f:
+                snapshot = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return {}
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if (snapshot.get("format"), snapshot.get("directory"), snapshot.get("version"),
+                snapshot.get("selection")) != (self.FORMAT, self.directory, self.version, self.selection):
+            return {}
+        return snapshot["files"]
+
+    def write(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Write to a temporary file first so a reader never sees half a snapshot
+        tmp_path = "%s.%d.tmp" % (self.path, os.getpid())
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"format": self.FORMAT, "directory": self.directory, "version": self.version,
+                         "selection": self.selection, "files": self.files}, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def load(self, filenames, workers=None, backend="lxml"):
+        """Return the records for filenames, in order, from the snapshot where
+        possible, and update the snapshot if any file had to be parsed"""
+        cached = self.read()
+        self.files = {}
+        self.changed = []
+        for fname in filenames:
+            name = os.path.basename(fname)
+            stat = os.stat(fname)
+            entry = cached.get(name)
+            if entry and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                self.files[name] = entry
+                continue
+            sha1 = file_sha1(fname)
+            if entry and entry[2] == sha1:
+                self.files[name] = (stat.st_mtime_ns, stat.st_size, sha1, entry[3])
+            else:
+                self.files[name] = (stat.st_mtime_ns, stat.st_size, sha1, None)
+                self.changed.append(fname)
+
+        for fname, record in zip(self.changed, parse_records(self.changed, self.version, workers, backend)):
+            name = os.path.basename(fname)
+            self.files[name] = self.files[name][:3] + (record,)
+        if self.changed or set(cached) != set(self.files):
+            self.write()
+        return [self.files[os.path.basename(fname)][3] for fname in filenames]
+
+
+def get_root_class_id(fname):
+    """Return the ID of the VNCLASS at the root of a file, without parsing
+    anything past the root element"""
+    for event, element in etree.iterparse(fname, events=("start",)):
+        return element.get("ID")
+
+
+class PredicatePattern(object):
+    """Frame.contains compiled once, for testing many frames against the same
+    predicates: the signature (see predicate_signature) of every predicate of
+    a list of Predicates or of a Frame. A frame matches when each of them has
+    a predicate in the frame with the same value and at least its args"""
+
+    def __init__(self, predicates):
+        if type(predicates) in [Frame, FrameRecord]:
+            predicates = predicates.predicates
+        elif type(predicates) != list:
+            raise Exception(str(type(predicates)) + " is not a valid input type")
+        self.signatures = [p.signature for p in predicates]
+        # The predicate values a frame needs, for the predicate index
+        self.values = []
+        for value, _ in self.signatures:
+            if value and value[0] not in self.values:
+                self.values.append(value[0])
+
+    def matches(self, frame):
+        signatures = [predicate.signature for predicate in frame.predicates]
+        for value, search_args in self.signatures:
+            for frame_value, frame_args in signatures:
+                if frame_value == value and search_args <= frame_args:
+                    break
+            else:
+                return False
+        return True
+
+    def match_all(self, frames):
+        """Return the (class, frame) pairs of frames whose frame matches"""
+        return [(vc, frame) for vc, frame in frames if self.matches(frame)]
+
+
+def predicate_signature(value, argtypes):
+    """The value of a predicate, as a tuple, and the set of its (type, value)
+    args with the question marks (?) taken out, which is all Frame.contains
+    compares"""
+    return tuple(value), frozenset([(t.replace('?', ''), v.replace('?', '')) for t, v in argtypes])
+
+
+def frozen(value):
+    """value with every list in it turned into a tuple, which is how records
+    store their lists, so that no one can edit what several records (or
+    versions) share"""
+    if isinstance(value, (list, tuple)):
+        return tuple([frozen(v) for v in value])
+    return value
+
+
+def thawed(value):
+    """value with every tuple in it turned into a new list, e.g. to work on a
+    copy of a restriction tree"""
+    if isinstance(value, (list, tuple)):
+        return [thawed(v) for v in value]
+    return value
+
+
+class LazyVerbClassDict(MutableMapping):
+    """Dict of verb classes for a lazy VerbNetParser. Looking up a class parses
+    the file it lives in the first time, and iterating over the dict parses
+    every remaining file."""
+
+    def __init__(self, parser, numerical=False):
+        self.parser = parser
+        self.numerical = numerical
+        self.data = {}
+
+    def __getitem__(self, class_ID):
+        if class_ID not in self.data:
+            self.parser._load_class(class_ID, self.numerical)
+        return self.data[class_ID]
+
+    def __contains__(self, class_ID):
+        try:
+            self[class_ID]
+        except KeyError:
+            return False
+        return True
+
+    def __setitem__(self, class_ID, vc):
+        self.data[class_ID] = vc
+
+    def __delitem__(self, class_ID):
+        del self.data[class_ID]
+
+    def __iter__(self):
+        self.parser._load_all()
+        return iter(self.data)
+
+    def __len__(self):
+        self.parser._load_all()
+        return len(self.data)
+
+    def __repr__(self):
+        return repr(self.data)
+
 
 class AbstractXML(object):
     """Abstract class to be inherited by other classes that share the same
     features"""
 
+    # The IDs of the (sub)class and the top level class the element is in, and
+    # the subclass depth of its class (0 for a top level class). VerbClass sets
+    # them for itself and everything in it, otherwise class_id() finds them by
+    # climbing the soup
+    class_ID = None
+    top_class_ID = None
+    depth = None
+
     def __init__(self, soup):
         self.soup = soup
         self.etree = etree.fromstring(self.pp())
@@ -188,6 +1011,8 @@ class AbstractXML(object):
           that is a VNCLASS or VNSUBCLASS (if subclasses flag set to True)
           in order to get the soup object, and grab the ID
         '''
+        if self.top_class_ID is not None:
+            return self.class_ID if subclasses else self.top_class_ID
         if subclasses:
             id_nodes = ["VNCLASS", "VNSUBCLASS"]
         else:
@@ -210,6 +1035,8 @@ class AbstractXML(object):
           that is a VNCLASS or VNSUBCLASS (if subclasses flag set to True)
           in order to get its ID
         '''
+        if self.top_class_ID is not None:
+            return self.class_ID if subclasses else self.top_class_ID
         if subclasses:
             id_nodes = ["VNCLASS", "VNSUBCLASS"]
         else:
@@ -223,6 +1050,11 @@ class AbstractXML(object):
 
         return get_class_id(self.soup)
 
+    def set_hierarchy(self, class_ID, top_class_ID):
+        self.class_ID = class_ID
+        self.top_class_ID = top_class_ID
+        self.depth = class_ID.count("-") - top_class_ID.count("-")
+
     def pp(self):
         # Better indentation for more readable XML
         indent = re.compile(r'^(\s*)', re.MULTILINE)
@@ -244,10 +1076,35 @@ class VerbClass(AbstractXML):
         self.version = version
         self.numerical_ID = "-".join(self.ID.split("-")[1:])
         self.members = self._members()
+        for member in self.members:
+            member.verb_class = self
         self.frames = self._frames()
         self.names = [mem.get_category('name')[0] for mem in self.members]
         self.themroles = self._themroles()
         self.subclasses = self._subclass()
+        # Set by the VerbNetParser that has the class, to keep its indexes up
+        # to date when members are added or removed
+        self.parser = None
+        self._set_hierarchy()
+
+    def _set_hierarchy(self):
+        """Store the class IDs of this class and of everything in it, so that
+        class_id() does not need to climb the soup. Everything in a section
+        (MEMBERS etc.) gets the class that section is in, like class_id()
+        would find"""
+        top = self.soup if self.soup.name == "VNCLASS" else self.soup.find_parent("VNCLASS")
+        top_class_ID = top["ID"] if top else self.ID
+        self.set_hierarchy(self.ID, top_class_ID)
+        for section, elements in [("MEMBERS", self.members), ("THEMROLES", self.themroles),
+                                  ("FRAMES", self.frames)]:
+            if not elements:
+                continue
+            owner = elements[0].soup.find_parent(section).find_parent(["VNCLASS", "VNSUBCLASS"])
+            for element in elements:
+                element.set_hierarchy(owner["ID"], top_class_ID)
+                if section == "FRAMES":
+                    for part in element.predicates + element.syntax:
+                        part.set_hierarchy(owner["ID"], top_class_ID)
 
     def __repr__(self):
         return str(self.ID) + "\n" + str([mem.__repr__() for mem in self.members]) \
@@ -288,13 +1145,22 @@ class VerbClass(AbstractXML):
         '''
 
         if type(input_member) == Member:
-            input_member_name = input_member.name[0]
+            input_member_name = input_member.name
         elif type(input_member) == str:
             input_member_name = input_member
 
         # Should only ever be one member with a unique name in a class,
         # so we can search by name and use [0]
-        return self.soup.MEMBERS.find_all("MEMBER", {"name": input_member_name})[0].extract()
+        mem_soup = self.soup.MEMBERS.find_all("MEMBER", {"name": input_member_name})[0].extract()
+        for member in [m for m in self.members if m.soup is mem_soup]:
+            self.members.remove(member)
+            member.verb_class = None
+            if self.parser:
+                self.parser._member_removed(self, member)
+        # Rebuilt rather than removed from, since members may have been renamed
+        # with Member.update_name() since names was filled
+        self.names = [m.name for m in self.members]
+        return mem_soup
 
     def add_member(self, input_member):
         '''
@@ -304,13 +1170,19 @@ class VerbClass(AbstractXML):
         '''
 
         if type(input_member) == Member:
-            mem_soup = input_member.soup
+            member = input_member
         elif type(input_member) == bs4.element.Tag:
-            mem_soup = input_member
+            member = Member(input_member, self.ID, self.version)
 
         # Should only ever be one member with a unique name in a class,
         # so we can search by name and use [0]
-        self.soup.MEMBERS.append(mem_soup)
+        self.soup.MEMBERS.append(member.soup)
+        member.set_hierarchy(self.ID, self.top_class_ID)
+        member.verb_class = self
+        self.members.append(member)
+        self.names.append(member.name)
+        if self.parser:
+            self.parser._member_added(self, member)
 
     def get_members(self):
         return self.members
@@ -362,9 +1234,13 @@ class Member(AbstractXML):
         self.version = version
         self.name = self.get_category('name')[0]
         self.wn = self.get_category('wn')
+        self.senses = parse_sense_keys(self.wn)
         self.grouping = self.get_category('grouping')
         self.features = self.get_category('features')
+        self.fn_mapping = self.get_category('fn_mapping')
         self.verbnet_key = self.get_category('verbnet_key')
+        # The VerbClass that lists the member, set by that class
+        self.verb_class = None
 
     def __repr__(self):
         return str(self.name + " " + str(self.verbnet_key))
@@ -377,10 +1253,18 @@ class Member(AbstractXML):
 
     def update_name(self, name):
         """
-        Update the name of a Member, and it's soup for XML output
+        Update the name of a Member, and it's soup for XML output, and
+        the names and indexes of its class and parser
         """
+        vc = self.verb_class
+        if vc is not None and vc.parser:
+            vc.parser._member_removed(vc, self)
         self.name = name
         self.soup["name"] = name
+        if vc is not None:
+            vc.names = [m.name for m in vc.members]
+            if vc.parser:
+                vc.parser._member_added(vc, self)
 
 
 class Frame(AbstractXML):
@@ -398,7 +1282,9 @@ class Frame(AbstractXML):
         self.xtag = self.get_category('xtag', self.soup.DESCRIPTION)
         self.examples = [example.text for example in self.soup.EXAMPLES.find_all("EXAMPLE")]
         self.syntax = self.get_syntax()
-        self.predicates = [Predicate(pred, self.version) for pred in self.soup.SEMANTICS.find_all("PRED")]
+        # The FrameIndexes (of a VerbNetParser) the frame is in, by name
+        self.indexes = {}
+        self._reset_preds()
 
     def __repr__(self):
         return "\nDN: " + str(self.description_num) + \
@@ -426,35 +1312,18 @@ class Frame(AbstractXML):
     def contains(self, input):
         '''
             input: a Frame object, or a list of Predicates,
-            which is also the return type of Frame.predicates
+            which is also the return type of Frame.predicates,
+            or a PredicatePattern compiled from either
         '''
-        if type(input) == list:
-            search_predicates = input
-        elif type(input) == Frame:
-            search_predicates = input.predicates
-        else:
+        if type(input) in [list, Frame]:
+            input = PredicatePattern(input)
+        elif type(input) != PredicatePattern:
             raise Exception(str(type(input)) + " is not a valid input type type")
 
-        predicates = self.predicates
-        matches = []
-
-        # Updated to be O(2n) to catch cases where there are multiple preds with the same name
-        for search_pred in search_predicates:
-            for predicate in predicates:
-                # Reset match flag
-                match = False
-                if predicate.value == search_pred.value and predicate.contains(search_pred):
-                    # We got a match! Go to next search_pred
-                    match = True
-                    break
-
-            # If this loop completes without finding a match, we must be missing a matching pred
-            if not match:
-                return False
-
-        # If loop completes, all search_preds must have a match, note this also
-        # Means if no search_preds are supplied, the method will return True
-        return True
+        # Every search predicate needs a predicate of this frame with the same
+        # value and (at least) its args. If no search_preds are supplied, the
+        # method will return True
+        return input.matches(self)
 
     def add_predicates(self, add_preds, reference_pred=None):
         '''
@@ -511,6 +1380,10 @@ class Frame(AbstractXML):
 
     def _reset_preds(self):
         self.predicates = [Predicate(pred, self.version) for pred in self.soup.SEMANTICS.find_all("PRED")]
+        for predicate in self.predicates:
+            predicate.frame = self
+        for index in self.indexes.values():
+            index.update_frame(self)
 
 
 class ThematicRole(AbstractXML):
@@ -543,9 +1416,15 @@ class ThematicRole(AbstractXML):
         else:
             return ['AND'] + [self.sel_restrictions(child) for child in soup.find_all('SELRESTR')]
 
+    def allows(self, features):
+        """Whether an argument with these features (like ["animate", "human"])
+        meets the selectional restrictions"""
+        return restrictions_allow(self.sel_restrictions, features)
+
     def compare_selres_with(self, other_themrole):
-        sel_restrictions = self.sel_restrictions
-        other_sel_restrictions = other_themrole.sel_restrictions
+        # Copies, since what is returned may be edited, and records share their trees
+        sel_restrictions = thawed(self.sel_restrictions)
+        other_sel_restrictions = thawed(other_themrole.sel_restrictions)
 
         if len(sel_restrictions) in [2, 0] and len(other_sel_restrictions)in [2, 0]:
             '''
@@ -601,6 +1480,9 @@ class Predicate(AbstractXML):
         self.args = self.soup.find_all('ARG')
         self.argtypes = [(self.get_category('type', arg)[0],
                           self.get_category('value', arg)[0]) for arg in self.args]
+        self.signature = predicate_signature(self.value, self.argtypes)
+        # The Frame the predicate is in, set by that frame
+        self.frame = None
 
     def __str__(self):
         return "%s(%s)" % (self.value[0], ', '.join([at[1] for at in self.argtypes]))
@@ -614,23 +1496,16 @@ class Predicate(AbstractXML):
             which is the return type of predicate.args
         '''
         if type(input) == bs4.element.ResultSet:
-            search_args = input
+            search_args = predicate_signature(self.value, [(self.get_category("type", arg)[0],
+                                                            self.get_category("value", arg)[0]) for arg in input])[1]
         elif type(input) == Predicate:
-            search_args = input.args
+            search_args = input.signature[1]
         else:
             raise Exception(str(type(input)) + " is not a valid input type")
 
-        # Hacky way to ignore question marks (?) in arg values
-        argtypes = [(argtype[0].replace('?', ''), argtype[1].replace('?', '')) for argtype in self.argtypes]
-
-        for search_arg in search_args:
-            # Use the same hacky way to ignore question marks (?) in arg values
-            if (self.get_category("type", search_arg)[0].replace('?', ''), self.get_category("value", search_arg)[0].replace('?', '')) not in argtypes: # one of the search_args is not an arg of this predicate
-                return False
-
-        # All args have been checked and have a match, thus not returning false
-        # This will also return if there were no input preds to loop over
-        return True
+        # Both signatures ignore question marks (?) in arg values. This is
+        # also true if there were no input args
+        return search_args <= self.signature[1]
 
     def add_args(self, add_args, order="first"):
         """
@@ -673,6 +1548,11 @@ class Predicate(AbstractXML):
         self.args = self.soup.find_all('ARG')
         self.argtypes = [(self.get_category('type', arg)[0],
                           self.get_category('value', arg)[0]) for arg in self.args]
+        self.signature = predicate_signature(self.value, self.argtypes)
+        # The indexes of the frame (like the ArgumentIndex) go by the args
+        if self.frame is not None:
+            for index in self.frame.indexes.values():
+                index.update_frame(self.frame)
 
 
 class SyntacticRole(AbstractXML):
@@ -684,6 +1564,7 @@ class SyntacticRole(AbstractXML):
         self.POS = self.soup.name
         self.value = self.get_category('value')
         self.restrictions = self.restrictions()
+        self.restrictions_logic = self.restrictions_logic()
 
     def restrictions(self):
         """Check for selectional restrictions
@@ -705,20 +1586,385 @@ class SyntacticRole(AbstractXML):
             children.append(self.get_category('type', child)[0])
         return children
 
+    def restrictions_logic(self):
+        """Whether any one of the restrictions is enough ("or"), or all are needed ("and")"""
+        restrs = self.soup.find(['SELRESTRS', 'SYNRESTRS']) if self.soup.name else None
+        return restrs.get('logic', 'and') if restrs else 'and'
+
+    def restriction_tree(self):
+        """The restrictions, nested like ThematicRole.sel_restrictions"""
+        pairs = [self.restrictions[i:i + 2] for i in range(0, len(self.restrictions or []), 2)]
+        return [self.restrictions_logic.upper()] + pairs
+
     def __repr__(self):
         return "\n" + str(self.POS) + "\tValue: " + str(self.value) \
                     + "\tRestrs: " + str(self.restrictions)
 
 
+class AbstractRecord(object):
+    """Abstract class for the soup-free, read-only counterparts of the classes
+    above. Records are frozen __slots__ objects holding only plain python
+    values, with tuples for lists, so they are small, and can be pickled and
+    sent between processes cheaply. Since there is no soup to walk up, the IDs
+    of the classes a record belongs to are stored when it is built."""
+
+    __slots__ = ("class_ID", "top_class_ID", "attrs")
+
+    def _set(self, **fields):
+        for name, value in fields.items():
+            object.__setattr__(self, name, frozen(value))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is read-only, use the soup model to edit VerbNet" % type(self).__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError("%s is read-only, use the soup model to edit VerbNet" % type(self).__name__)
+
+    @classmethod
+    def _fields(cls):
+        # Private slots (like a cached soup) are left out of pickles
+        if "_field_names" not in cls.__dict__:
+            cls._field_names = tuple(s for c in reversed(cls.__mro__) for s in c.__dict__.get("__slots__", ())
+                                     if not s.startswith("_"))
+        return cls._field_names
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self._fields())
+
+    def __setstate__(self, state):
+        setattr = object.__setattr__
+        for name, value in zip(self._fields(), state):
+            setattr(self, name, value)
+
+    def class_id(self, subclasses=True):
+        return self.class_ID if subclasses else self.top_class_ID
+
+    def numerical_class_id(self):
+        return "-".join(self.class_id().split("-")[1:])
+
+    def get_class(self, subclasses=True):
+        return self.class_id(subclasses)
+
+    @property
+    def depth(self):
+        return self.class_ID.count("-") - self.top_class_ID.count("-")
+
+    def compare_attrs(self, compare):
+        updates = {}
+        for k, v in self.attrs.items():
+            if compare.attrs.get(k) != v:
+                updates[k] = compare.attrs.get(k)
+
+        return updates
+
+
+class VerbClassRecord(AbstractRecord):
+    """Read-only VerbClass. The soup of the class is only parsed, from the file
+    the record came from, when it is asked for, e.g. to edit the class through
+    to_verb_class()"""
+
+    __slots__ = ("ID", "version", "numerical_ID", "members", "frames", "names", "themroles", "subclasses",
+                 "filename", "_soup")
+
+    def __init__(self, ID, members, frames, themroles, subclasses, top_class_ID=None, version="3.4",
+                 filename=None):
+        self._set(ID=ID, class_ID=ID, top_class_ID=top_class_ID if top_class_ID else ID, attrs={"ID": ID},
+                  version=version, numerical_ID="-".join(ID.split("-")[1:]), members=members, frames=frames,
+                  names=[mem.name for mem in members], themroles=themroles, subclasses=subclasses,
+                  filename=filename)
+
+    @classmethod
+    def from_verb_class(cls, vc, top_class_ID=None, filename=None):
+        top_class_ID = top_class_ID if top_class_ID else vc.ID
+        # The elements keep the ID of the (sub)class whose section they are in,
+        # which is not always vc, e.g. for roles a subclass takes from its parent
+        return cls(vc.ID,
+                   [MemberRecord.from_member(m, m.class_id(), top_class_ID) for m in vc.members],
+                   [FrameRecord.from_frame(f, f.class_id(), top_class_ID) for f in vc.frames],
+                   [ThematicRoleRecord.from_themrole(t, t.class_id(), top_class_ID) for t in vc.themroles],
+                   [cls.from_verb_class(sub, top_class_ID, filename) for sub in vc.subclasses],
+                   top_class_ID, vc.version, filename)
+
+    __repr__ = VerbClass.__repr__
+    __lt__ = VerbClass.__lt__
+    __gt__ = VerbClass.__gt__
+
+    @property
+    def soup(self):
+        """The VNCLASS or VNSUBCLASS soup of this class, parsed from its file
+        the first time it is needed"""
+        try:
+            return self._soup
+        except AttributeError:
+            pass
+        if not self.filename:
+            raise Exception("%s was not read from a file, there is no soup to attach" % self.ID)
+        soup = bs4.BeautifulSoup(open(self.filename), "lxml-xml")
+        self._set(_soup=soup.find(["VNCLASS", "VNSUBCLASS"], {"ID": self.ID}))
+        return self._soup
+
+    def to_verb_class(self):
+        """Return an editable VerbClass for this class, built from its soup"""
+        return VerbClass(self.soup, self.version)
+
+    def pp(self):
+        return AbstractXML.pp(self)
+
+    def is_subclass(self):
+        return self.top_class_ID != self.ID
+
+    def get_members(self):
+        return self.members
+
+    def frames_and_subclass_frames(self):
+        return list(self.frames) + [f for sub in self.get_all_subclasses() for f in sub.frames]
+
+    get_all_subclasses = VerbClass.get_all_subclasses
+
+
+class MemberRecord(AbstractRecord):
+    """Read-only Member"""
+
+    __slots__ = ("name", "wn", "senses", "grouping", "features", "fn_mapping", "verbnet_key")
+
+    def __init__(self, attrs, class_ID, top_class_ID):
+        self._set(attrs=attrs, class_ID=class_ID, top_class_ID=top_class_ID,
+                  name=attrs.get('name', '').split()[0],
+                  wn=attrs.get('wn', '').split(),
+                  senses=parse_sense_keys(attrs.get('wn', '').split()),
+                  grouping=attrs.get('grouping', '').split(),
+                  features=attrs.get('features', '').split(),
+                  fn_mapping=attrs.get('fn_mapping', '').split(),
+                  verbnet_key=attrs.get('verbnet_key', '').split())
+
+    @classmethod
+    def from_member(cls, member, class_ID, top_class_ID):
+        return cls(dict(member.soup.attrs), class_ID, top_class_ID)
+
+    __repr__ = Member.__repr__
+    __lt__ = Member.__lt__
+    __gt__ = Member.__gt__
+
+
+class FrameRecord(AbstractRecord):
+    """Read-only Frame, attrs are those of its DESCRIPTION"""
+
+    __slots__ = ("description_num", "primary", "secondary", "xtag", "examples", "syntax", "predicates")
+
+    def __init__(self, description, examples, syntax, predicates, class_ID, top_class_ID):
+        self._set(attrs=description, class_ID=class_ID, top_class_ID=top_class_ID,
+                  description_num=description.get('descriptionNumber', '').split(),
+                  primary=description.get('primary', '').split(),
+                  secondary=description.get('secondary', '').split(),
+                  xtag=description.get('xtag', '').split(),
+                  examples=examples, syntax=syntax, predicates=predicates)
+
+    @classmethod
+    def from_frame(cls, frame, class_ID, top_class_ID):
+        return cls(dict(frame.soup.DESCRIPTION.attrs), frame.examples,
+                   [SyntacticRoleRecord.from_synrole(r, class_ID, top_class_ID) for r in frame.syntax],
+                   [PredicateRecord.from_predicate(p, class_ID, top_class_ID) for p in frame.predicates],
+                   class_ID, top_class_ID)
+
+    __repr__ = Frame.__repr__
+    pp_syntax = Frame.pp_syntax
+    pp_semantics = Frame.pp_semantics
+
+    def contains(self, input):
+        '''
+            input: a Frame or FrameRecord, a list of Predicates or PredicateRecords,
+            or a PredicatePattern
+        '''
+        if type(input) in [list, Frame, FrameRecord]:
+            input = PredicatePattern(input)
+        elif type(input) != PredicatePattern:
+            raise Exception(str(type(input)) + " is not a valid input type type")
+        return input.matches(self)
+
+
+class ThematicRoleRecord(AbstractRecord):
+    """Read-only ThematicRole"""
+
+    __slots__ = ("role_type", "sel_restrictions")
+
+    def __init__(self, attrs, sel_restrictions, class_ID, top_class_ID):
+        self._set(attrs=attrs, class_ID=class_ID, top_class_ID=top_class_ID,
+                  role_type=attrs.get('type', '').split()[0], sel_restrictions=sel_restrictions)
+
+    @classmethod
+    def from_themrole(cls, themrole, class_ID, top_class_ID):
+        return cls(dict(themrole.soup.attrs), themrole.sel_restrictions, class_ID, top_class_ID)
+
+    allows = ThematicRole.allows
+    compare_selres_with = ThematicRole.compare_selres_with
+    identical_selres_with = ThematicRole.identical_selres_with
+    __repr__ = ThematicRole.__repr__
+
+
+class PredicateRecord(AbstractRecord):
+    """Read-only Predicate. There are no ARG soups, so argtypes is the only view
+    of the arguments"""
+
+    __slots__ = ("value", "argtypes", "signature")
+
+    def __init__(self, attrs, argtypes, class_ID, top_class_ID):
+        value = attrs.get('value', '').split()
+        self._set(attrs=attrs, class_ID=class_ID, top_class_ID=top_class_ID,
+                  value=value, argtypes=argtypes, signature=predicate_signature(value, argtypes))
+
+    @classmethod
+    def from_predicate(cls, predicate, class_ID, top_class_ID):
+        return cls(dict(predicate.soup.attrs), predicate.argtypes, class_ID, top_class_ID)
+
+    __str__ = Predicate.__str__
+    __repr__ = Predicate.__repr__
+
+    def contains(self, input):
+        '''
+            input: a Predicate or PredicateRecord, whose argtypes should all be
+            argtypes of this predicate, ignoring question marks
+        '''
+        if type(input) not in [Predicate, PredicateRecord]:
+            raise Exception(str(type(input)) + " is not a valid input type")
+        return input.signature[1] <= self.signature[1]
+
+
+class SyntacticRoleRecord(AbstractRecord):
+    """Read-only SyntacticRole"""
+
+    __slots__ = ("POS", "value", "restrictions", "restrictions_logic")
+
+    def __init__(self, POS, attrs, restrictions, class_ID, top_class_ID, restrictions_logic="and"):
+        self._set(attrs=attrs, class_ID=class_ID, top_class_ID=top_class_ID,
+                  POS=POS, value=attrs.get('value', '').split(), restrictions=restrictions,
+                  restrictions_logic=restrictions_logic)
+
+    @classmethod
+    def from_synrole(cls, synrole, class_ID, top_class_ID):
+        return cls(synrole.POS, dict(synrole.soup.attrs), synrole.restrictions, class_ID, top_class_ID,
+                   synrole.restrictions_logic)
+
+    __repr__ = SyntacticRole.__repr__
+    restriction_tree = SyntacticRole.restriction_tree
+
+
+def parse_class_record(fname, version=None):
+    """Parse a single file and return its class as a VerbClassRecord. This is
+    what each process runs for VerbNetParser(workers=N)"""
+    return VerbClassRecord.from_verb_class(VerbClass(bs4.BeautifulSoup(open(fname), "lxml-xml").VNCLASS, version),
+                                           filename=fname)
+
+
+def _soup_children_count(element):
+    """Number of children BeautifulSoup would give element, which counts the
+    (whitespace) strings between tags too"""
+    count = 1 if element.text else 0
+    for child in element:
+        count += 2 if child.tail else 1
+    return count
+
+
+def _lxml_sel_restrictions(element):
+    """lxml version of ThematicRole.sel_restrictions, which gives the same
+    nested lists for the SELRESTRS element of a THEMROLE"""
+    if element is None or not isinstance(element.tag, str):
+        return None
+    if _soup_children_count(element) == 0:
+        return element.get('Value', '').split() + element.get('type', '').split()
+    elif element.get('logic', '').split():
+        children = ['OR'] + [_lxml_sel_restrictions(child) for child in element]
+        return [child for child in children if child is not None]
+    elif _soup_children_count(element) == 3:
+        return _lxml_sel_restrictions(next(element.iterdescendants('SELRESTR')))
+    else:
+        return ['AND'] + [_lxml_sel_restrictions(child) for child in element.iterdescendants('SELRESTR')]
+
+
+def _lxml_frame_record(element, class_ID, top_class_ID):
+    description = element.find('.//DESCRIPTION')
+    syntax = []
+    for role in element.find('.//SYNTAX'):
+        if not isinstance(role.tag, str):
+            continue
+        restr_tag = 'SELRESTR' if role.tag == 'PREP' else 'SYNRESTR'
+        restrictions = []
+        for restr in role.iterdescendants(restr_tag):
+            restrictions += [restr.get('Value').split()[0], restr.get('type').split()[0]]
+        restrs = next(role.iterdescendants('SELRESTRS', 'SYNRESTRS'), None)
+        logic = restrs.get('logic', 'and') if restrs is not None else 'and'
+        syntax.append(SyntacticRoleRecord(role.tag, dict(role.attrib), restrictions, class_ID, top_class_ID, logic))
+    predicates = []
+    for pred in element.find('.//SEMANTICS').iter('PRED'):
+        argtypes = [(arg.get('type').split()[0], arg.get('value').split()[0]) for arg in pred.iter('ARG')]
+        predicates.append(PredicateRecord(dict(pred.attrib), argtypes, class_ID, top_class_ID))
+    return FrameRecord(dict(description.attrib),
+                       ["".join(example.itertext()) for example in element.find('.//EXAMPLES').iter('EXAMPLE')],
+                       syntax, predicates, class_ID, top_class_ID)
+
+
+def iterparse_class_record(fname, version=None):
+    """Parse a single file with lxml.etree.iterparse, without going through
+    BeautifulSoup, and return its class as a VerbClassRecord.
+
+    Each MEMBER, THEMROLE and FRAME is turned into a record as soon as its end
+    tag is seen, and then cleared. Like VerbClass, a class with no MEMBERS,
+    THEMROLES or FRAMES of its own gets the first ones found in its subclasses."""
+    stack = []
+    for event, element in etree.iterparse(fname, events=("start", "end")):
+        if event == "start":
+            if element.tag in ("VNCLASS", "VNSUBCLASS"):
+                ID = element.get("ID")
+                stack.append({"ID": ID, "top_class_ID": stack[0]["ID"] if stack else ID,
+                              "MEMBERS": None, "THEMROLES": None, "FRAMES": None, "sections": [],
+                              "SUBCLASSES": None, "subclasses": []})
+            elif element.tag in ("MEMBERS", "THEMROLES", "FRAMES") and stack[-1][element.tag] is None:
+                stack[-1][element.tag] = []
+                stack[-1]["sections"].append(element)
+            elif element.tag == "SUBCLASSES" and stack[-1]["SUBCLASSES"] is None:
+                stack[-1]["SUBCLASSES"] = element
+            continue
+
+        ctx = stack[-1]
+        if element.tag in ("MEMBER", "THEMROLE", "FRAME") and element.getparent() not in ctx["sections"]:
+            # Stray element outside of the class's own section, which VerbClass ignores too
+            pass
+        elif element.tag == "MEMBER":
+            ctx["MEMBERS"].append(MemberRecord(dict(element.attrib), ctx["ID"], ctx["top_class_ID"]))
+        elif element.tag == "THEMROLE":
+            ctx["THEMROLES"].append(ThematicRoleRecord(dict(element.attrib),
+                                                       _lxml_sel_restrictions(element.find('.//SELRESTRS')),
+                                                       ctx["ID"], ctx["top_class_ID"]))
+        elif element.tag == "FRAME":
+            ctx["FRAMES"].append(_lxml_frame_record(element, ctx["ID"], ctx["top_class_ID"]))
+        elif element.tag in ("VNCLASS", "VNSUBCLASS"):
+            stack.pop()
+            for section in ("MEMBERS", "THEMROLES", "FRAMES"):
+                if ctx[section] is None:
+                    ctx[section] = next((sub[section] for sub in ctx["subclasses"] if sub[section] is not None),
+                                        None)
+            ctx["record"] = VerbClassRecord(ctx["ID"], ctx["MEMBERS"] or [], ctx["FRAMES"] or [],
+                                            ctx["THEMROLES"] or [], [sub["record"] for sub in ctx["subclasses"]],
+                                            ctx["top_class_ID"], version, fname)
+            if not stack:
+                return ctx["record"]
+            if element.getparent() is stack[-1]["SUBCLASSES"]:
+                stack[-1]["subclasses"].append(ctx)
+        else:
+            continue
+        element.clear()
+
+
 def search(verbclasslist, pred_type=None, themroles=None, synroles=None, semroles=None):
-    """Returns frames for verbclasses that match search parameters
+    """Returns (verbclass, frame) pairs for the frames that match search parameters,
+    verbclasslist can be a VerbNetParser, which looks them up in its predicate index
     TODO: figure out what it means to search for themroles, synroles, and semroles"""
+    if isinstance(verbclasslist, VerbNetParser):
+        return list(verbclasslist.predicate_index.frames(pred_type))
     successes = []
     for vc in verbclasslist:
         for frame in vc.frames:
-            for pred in frame.predicates:
-                if pred.value[0] == pred_type:
-                    successes.append((vc, frame))
+            if [pred for pred in frame.predicates if pred.value and pred.value[0] == pred_type]:
+                successes.append((vc, frame))
     return successes
 
 
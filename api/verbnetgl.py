@@ -37,7 +37,7 @@ $ python verbnetgl.py -td
 
 import os, sys, itertools, getopt
 from bs4 import BeautifulSoup as soup
-from verbnetparser import VerbNetParser
+from verbnet import VerbNetParser
 from writer import HtmlGLWriter, HtmlClassWriter
 from search import search_by_predicate, search_by_argtype
 from search import search_by_ID, search_by_subclass_ID
@@ -64,6 +64,9 @@ class GLVerbClass(object):
 
     def is_motion_class(self):
         """Return True if one of the frames is a motion frame."""
+        index = self.frame_index("predicates")
+        if index:
+            return bool([f for f in self.verbclass.frames if index.frame_has(f, 'motion')])
         for f in self.frames:
             if f.is_motion_frame():
                 return True
@@ -72,12 +75,24 @@ class GLVerbClass(object):
     def is_change_of_state_class(self):
         """Return True if the class is a change-of-state class, which is defined as
         having an argtype that contains ch_of in one of the frames."""
-        return True if [t for t in self.argtypes() if 'ch_of_' in t] else False
+        return self.has_argtype_containing('ch_of_')
 
     def is_change_of_info_class(self):
         """Return True if the class is a change-of-info class, which is defined as
         having an argtype that contains ch_of_info in one of the frames."""
-        return True if [t for t in self.argtypes() if 'tr_of_info' in t] else False
+        return self.has_argtype_containing('tr_of_info')
+
+    def has_argtype_containing(self, substring):
+        index = self.frame_index("arguments")
+        if index:
+            return bool([f for f in self.verbclass.frames if index.frame_matches(f, substring, contains=True)])
+        return True if [t for t in self.argtypes() if substring in t] else False
+
+    def frame_index(self, name):
+        """The frame index with that name of the VerbNetParser the VerbClass came
+        from, built if it was not yet, or None for a class without a parser"""
+        parser = getattr(self.verbclass, "parser", None)
+        return parser._built_frame_indexes()[name] if parser else None
 
     def frames(self):
         return [GLFrame(self, frame) for frame in self.verbclass.frames]